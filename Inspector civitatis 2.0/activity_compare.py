@@ -1,6 +1,10 @@
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
-import torch
+import os
+from sentence_transformers import SentenceTransformer
+from cache_modelos import CacheEmbeddings, hash_texto
+from indice_ann import IndiceANN
+
+MODELO = 'paraphrase-multilingual-MiniLM-L12-v2'
 
 def cruzar_con_ia(archivo200, archivo1000, output_name="comparativa_semantica.csv"):
     # 1. Cargar datos
@@ -9,29 +13,33 @@ def cruzar_con_ia(archivo200, archivo1000, output_name="comparativa_semantica.cs
 
     # 2. Cargar el modelo de IA (Multilingüe para español)
     print("Cargando modelo de lenguaje... (esto ocurre solo la primera vez)")
-    model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+    model = SentenceTransformer(MODELO)
+    cache = CacheEmbeddings(model, MODELO)
 
     # 3. Convertir actividades en "vectores" (Embeddings)
     print("Analizando significados de las actividades...")
     actividades1 = df1['actividad'].tolist()
     actividades2 = df2['actividad'].tolist()
 
-    embeddings1 = model.encode(actividades1, convert_to_tensor=True)
-    embeddings2 = model.encode(actividades2, convert_to_tensor=True)
+    # Solo se codifican las actividades que no estén ya en la caché
+    embeddings1 = cache.encode(actividades1)
+    embeddings2 = cache.encode(actividades2)
 
-    # 4. Calcular similitud de coseno
-    # Compara cada vector de la lista 1 contra todos los de la lista 2
-    cos_scores = util.cos_sim(embeddings1, embeddings2)
+    # 4. Buscar el vecino más cercano (similitud de coseno) dentro del mismo destino
+    # con un índice ANN, en vez de comparar cada actividad contra todas las demás
+    nombre_indice = 'minilm_' + os.path.splitext(os.path.basename(archivo1000))[0]
+    indice = IndiceANN(nombre_indice, embeddings2, df2['destino'].tolist(), [hash_texto(t) for t in actividades2])
+    hits = indice.buscar(embeddings1, df1['destino'].tolist(), top_k=1)
 
     resultados = []
 
     print("Buscando las mejores coincidencias...")
     for i in range(len(actividades1)):
-        # Buscamos el índice con el puntaje más alto en la matriz de similitud
-        score, idx_match = torch.max(cos_scores[i], dim=0)
+        mejor = hits[i][0]
+        score = mejor['score']
         
         fila_p1 = df1.iloc[i]
-        fila_p2 = df2.iloc[idx_match.item()]
+        fila_p2 = df2.iloc[mejor['corpus_id']]
 
         resultados.append({
             'destino': fila_p1['destino'],
@@ -39,7 +47,7 @@ def cruzar_con_ia(archivo200, archivo1000, output_name="comparativa_semantica.cs
             'precio1': fila_p1['precio_real'],
             'actividad2': fila_p2['actividad'],
             'precio2': fila_p2['precio_real'],
-            'similitud_%': round(score.item() * 100, 2)
+            'similitud_%': round(score * 100, 2)
         })
 
     # 5. Guardar resultado
@@ -2,15 +2,20 @@ import os
 import ssl
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer, CrossEncoder, util
-from scipy.optimize import linear_sum_assignment
-from tqdm import tqdm
+from sentence_transformers import SentenceTransformer, CrossEncoder
+from cache_modelos import CacheEmbeddings, hash_texto
+from indice_ann import IndiceANN
+from asignacion import asignar_por_componentes
+from reranking import puntuar_pares
 
 
 # NOMBRES DE TUS ARCHIVOS (Asegúrate que coincidan)
 ARCHIVO_PEQUENO = './data/actividades_triviantes.csv' # Tu archivo de 200
 ARCHIVO_GRANDE = './data/colombia_civitatis_20260130_112927.csv' # Tu archivo de 1000
 
+MODELO_BI = 'intfloat/multilingual-e5-large'
+MODELO_CROSS = 'cross-encoder/ms-marco-MiniLM-L12-v2'
+
 # PARCHE SSL
 os.environ['CURL_CA_BUNDLE'] = ''
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -37,38 +42,36 @@ textos_b = preparar_texto_enriquecido(df_b)
 
 # 2. MODELO LIGERO (FILTRO)
 print("Fase 1: Generando candidatos rápidos...")
-bi_model = SentenceTransformer('intfloat/multilingual-e5-large')
-emb_a = bi_model.encode(textos_a, convert_to_tensor=True, show_progress_bar=True)
-emb_b = bi_model.encode(textos_b, convert_to_tensor=True, show_progress_bar=True)
+bi_model = SentenceTransformer(MODELO_BI)
+# Solo se codifican las actividades nuevas o modificadas; el resto sale de la caché
+cache_bi = CacheEmbeddings(bi_model, MODELO_BI)
+emb_a = cache_bi.encode(textos_a)
+emb_b = cache_bi.encode(textos_b)
 
-# Buscamos los 50 mejores candidatos
+# Buscamos los 50 mejores candidatos dentro del mismo destino (índice ANN persistente)
 top_k = 50
-hits = util.semantic_search(emb_a, emb_b, top_k=top_k)
+indice_b = IndiceANN('e5_' + os.path.splitext(os.path.basename(ARCHIVO_GRANDE))[0], emb_b,
+                     df_b['destino'].tolist(), [hash_texto(t) for t in textos_b])
+hits = indice_b.buscar(emb_a, df_a['destino'].tolist(), top_k=top_k)
 
 # 3. MODELO PESADO (PRECISIÓN CRÍTICA)
 print(f"Fase 2: Re-ranking de alta precisión (Usando Core Ultra 7)...")
-cross_model = CrossEncoder('cross-encoder/ms-marco-MiniLM-L12-v2', max_length=512)
+cross_model = CrossEncoder(MODELO_CROSS, max_length=512)
 
-sim_matrix = np.full((len(textos_a), len(textos_b)), -100.0)
+# Solo guardamos los pares candidatos (grafo disperso), no una matriz N×M
+pares_i = [i for i, hit_list in enumerate(hits) for _ in hit_list]
+pares_j = [h['corpus_id'] for hit_list in hits for h in hit_list]
 
-for i, hit_list in enumerate(tqdm(hits, desc="Analizando pares")):
-    indices_candidatos = [h['corpus_id'] for h in hit_list]
-    pares = [[textos_a[i], textos_b[idx]] for idx in indices_candidatos]
-    
-    # batch_size=32 aprovecha mejor tus 14 núcleos
-    scores = cross_model.predict(pares, batch_size=16, show_progress_bar=False)
-    
-    for score, idx_b in zip(scores, indices_candidatos):
-        sim_matrix[i, idx_b] = score
+# Todos los pares juntos en lotes grandes ordenados por largo; los ya puntuados salen de la caché
+pares_score = puntuar_pares(cross_model, MODELO_CROSS, [[textos_a[i], textos_b[j]] for i, j in zip(pares_i, pares_j)])
 
 # 4. ASIGNACIÓN ÚNICA
-print("Fase 3: Ejecutando Algoritmo Húngaro para parejas únicas...")
-row_ind, col_ind = linear_sum_assignment(-sim_matrix)
+print("Fase 3: Ejecutando Algoritmo Húngaro por componentes para parejas únicas...")
+asignaciones = asignar_por_componentes(pares_i, pares_j, pares_score, len(textos_a), len(textos_b))
 
 # 5. RESULTADOS
 resultados = []
-for i, j in zip(row_ind, col_ind):
-    score = sim_matrix[i, j]
+for i, j, score in asignaciones:
     if score > -10: # Filtro de seguridad
         resultados.append({
             'ID_A': i,
@@ -0,0 +1,107 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components, min_weight_full_bipartite_matching
+
+# Tope de celdas para resolver un componente con matriz densa (~200 MB en float64)
+MAX_CELDAS_DENSAS = 25_000_000
+
+# Valor de "no es candidato" (igual que el relleno de la matriz densa original)
+PUNTAJE_SIN_CANDIDATO = -100.0
+
+
+def _deduplicar(filas, columnas, puntajes):
+    """Si un par (i, j) aparece repetido nos quedamos con su mejor puntaje."""
+    orden = np.lexsort((-puntajes, columnas, filas))
+    filas, columnas, puntajes = filas[orden], columnas[orden], puntajes[orden]
+    primero = np.ones(len(filas), dtype=bool)
+    primero[1:] = (filas[1:] != filas[:-1]) | (columnas[1:] != columnas[:-1])
+    return filas[primero], columnas[primero], puntajes[primero]
+
+
+def _resolver_denso(filas_loc, cols_loc, puntajes, n_filas, n_cols):
+    matriz = np.full((n_filas, n_cols), PUNTAJE_SIN_CANDIDATO)
+    matriz[filas_loc, cols_loc] = puntajes
+    row_ind, col_ind = linear_sum_assignment(-matriz)
+    candidatos = matriz[row_ind, col_ind] > PUNTAJE_SIN_CANDIDATO
+    return row_ind[candidatos], col_ind[candidatos]
+
+
+def _resolver_disperso(filas_loc, cols_loc, puntajes, n_filas, n_cols):
+    """
+    Matching de peso mínimo sobre el grafo disperso. Cada fila recibe además una
+    columna ficticia propia ("sin pareja") para que siempre exista solución completa.
+    """
+    # Valor de un par = puntaje - relleno (> 0); la columna ficticia vale 0.
+    # Costos positivos: techo - valor
+    valores = puntajes - PUNTAJE_SIN_CANDIDATO
+    techo = valores.max() + 1.0
+    ficticias = np.arange(n_filas)
+    grafo = csr_matrix(
+        (np.concatenate([techo - valores, np.full(n_filas, techo)]),
+         (np.concatenate([filas_loc, ficticias]), np.concatenate([cols_loc, n_cols + ficticias]))),
+        shape=(n_filas, n_cols + n_filas)
+    )
+    row_ind, col_ind = min_weight_full_bipartite_matching(grafo)
+    reales = col_ind < n_cols
+    return row_ind[reales], col_ind[reales]
+
+
+def _resolver_componente(filas, columnas, puntajes):
+    filas_unicas, filas_loc = np.unique(filas, return_inverse=True)
+    cols_unicas, cols_loc = np.unique(columnas, return_inverse=True)
+    n_filas, n_cols = len(filas_unicas), len(cols_unicas)
+
+    if n_filas == 1 or n_cols == 1:
+        mejor = np.argmax(puntajes)
+        return [(int(filas[mejor]), int(columnas[mejor]), float(puntajes[mejor]))]
+
+    if n_filas * n_cols <= MAX_CELDAS_DENSAS:
+        row_ind, col_ind = _resolver_denso(filas_loc, cols_loc, puntajes, n_filas, n_cols)
+    else:
+        row_ind, col_ind = _resolver_disperso(filas_loc, cols_loc, puntajes, n_filas, n_cols)
+
+    lookup = {(f, c): p for f, c, p in zip(filas_loc, cols_loc, puntajes)}
+    return [
+        (int(filas_unicas[f]), int(cols_unicas[c]), float(lookup[(f, c)]))
+        for f, c in zip(row_ind, col_ind)
+    ]
+
+
+def asignar_por_componentes(filas, columnas, puntajes, n_a, n_b, max_hilos=None):
+    """
+    Asignación 1 a 1 (máxima suma de puntajes) usando solo los pares candidatos.
+
+    Arma el grafo bipartito A-B con los pares (filas[k], columnas[k]), lo separa
+    en componentes conexas y resuelve cada una por su cuenta (en paralelo). Da el
+    mismo resultado que el húngaro sobre la matriz N×M rellena con
+    PUNTAJE_SIN_CANDIDATO, pero la memoria crece con los pares, no con N×M.
+
+    Devuelve una lista de (i, j, puntaje) solo con pares candidatos.
+    """
+    filas = np.asarray(filas, dtype=np.int64)
+    columnas = np.asarray(columnas, dtype=np.int64)
+    puntajes = np.asarray(puntajes, dtype=np.float64)
+    if len(filas) == 0:
+        return []
+    filas, columnas, puntajes = _deduplicar(filas, columnas, puntajes)
+
+    # Nodos 0..n_a-1 = lado A, n_a..n_a+n_b-1 = lado B
+    n_nodos = n_a + n_b
+    adyacencia = coo_matrix((np.ones(len(filas)), (filas, columnas + n_a)), shape=(n_nodos, n_nodos))
+    _, etiquetas = connected_components(adyacencia, directed=False)
+
+    componente = etiquetas[filas]
+    orden = np.argsort(componente, kind='stable')
+    cortes = np.flatnonzero(np.diff(componente[orden])) + 1
+    grupos = np.split(orden, cortes)
+    # Los componentes grandes primero para repartir mejor la carga entre hilos
+    grupos.sort(key=len, reverse=True)
+
+    print(f"   ↳ {len(grupos)} componentes | el mayor tiene {len(grupos[0])} pares candidatos")
+
+    with ThreadPoolExecutor(max_workers=max_hilos or os.cpu_count()) as executor:
+        partes = executor.map(lambda g: _resolver_componente(filas[g], columnas[g], puntajes[g]), grupos)
+        return [par for parte in partes for par in parte]
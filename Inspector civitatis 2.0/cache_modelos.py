@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import numpy as np
+
+# Carpeta donde se guardan los embeddings ya calculados (uno por modelo)
+CARPETA_CACHE = './cache_embeddings'
+
+
+def normalizar_para_cache(texto):
+    """Misma actividad con espacios distintos = misma clave."""
+    return " ".join(str(texto).split())
+
+
+def hash_texto(texto):
+    return hashlib.blake2b(normalizar_para_cache(texto).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CacheEmbeddings:
+    """
+    Embeddings persistentes por (modelo, texto normalizado).
+
+    Por modelo se guardan tres archivos:
+      - <modelo>.f16    matriz float16 (filas de `dimension`), solo se agrega al final
+      - <modelo>.claves un hash de texto por línea, en el mismo orden que las filas
+      - <modelo>.json   dimensión del vector
+    La matriz se abre con np.memmap, así que no se carga entera en RAM.
+    """
+
+    def __init__(self, modelo, nombre_modelo, carpeta=CARPETA_CACHE):
+        self.modelo = modelo
+        os.makedirs(carpeta, exist_ok=True)
+        base = os.path.join(carpeta, re.sub(r'[^A-Za-z0-9_.-]+', '_', nombre_modelo))
+        self.ruta_vectores = base + '.f16'
+        self.ruta_claves = base + '.claves'
+        self.ruta_meta = base + '.json'
+
+        if os.path.exists(self.ruta_meta):
+            with open(self.ruta_meta, 'r', encoding='utf-8') as f:
+                self.dimension = json.load(f)['dimension']
+        else:
+            self.dimension = modelo.get_sentence_embedding_dimension()
+            with open(self.ruta_meta, 'w', encoding='utf-8') as f:
+                json.dump({'modelo': nombre_modelo, 'dimension': self.dimension}, f)
+
+        self.indice = self._cargar_indice()
+
+    def _cargar_indice(self):
+        if not os.path.exists(self.ruta_claves) or not os.path.exists(self.ruta_vectores):
+            return {}
+        with open(self.ruta_claves, 'r', encoding='utf-8') as f:
+            claves = [linea.strip() for linea in f if linea.strip()]
+        # Si un corte dejó los dos archivos desalineados, recortamos al tramo común
+        bytes_fila = 2 * self.dimension
+        filas = min(len(claves), os.path.getsize(self.ruta_vectores) // bytes_fila)
+        if filas != len(claves) or filas * bytes_fila != os.path.getsize(self.ruta_vectores):
+            claves = claves[:filas]
+            with open(self.ruta_vectores, 'r+b') as f:
+                f.truncate(filas * bytes_fila)
+            with open(self.ruta_claves, 'w', encoding='utf-8') as f:
+                f.write("".join(clave + "\n" for clave in claves))
+        return {clave: fila for fila, clave in enumerate(claves)}
+
+    def __len__(self):
+        return len(self.indice)
+
+    def encode(self, textos, show_progress_bar=True):
+        """Devuelve un np.ndarray float32 (len(textos), dimension); solo codifica lo nuevo."""
+        claves = [hash_texto(t) for t in textos]
+
+        faltantes = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in self.indice and clave not in faltantes:
+                faltantes[clave] = texto
+
+        print(f"   ↳ Embeddings en caché: {len(textos) - len(faltantes)}/{len(textos)} | Nuevos a codificar: {len(faltantes)}")
+
+        if faltantes:
+            nuevos = self.modelo.encode(
+                list(faltantes.values()), convert_to_numpy=True, show_progress_bar=show_progress_bar
+            ).astype(np.float16)
+            # Primero los vectores y luego las claves: ante un corte nunca queda una clave sin vector
+            with open(self.ruta_vectores, 'ab') as f:
+                f.write(nuevos.tobytes())
+            with open(self.ruta_claves, 'a', encoding='utf-8') as f:
+                f.write("".join(clave + "\n" for clave in faltantes))
+            inicio = len(self.indice)
+            for desplazamiento, clave in enumerate(faltantes):
+                self.indice[clave] = inicio + desplazamiento
+
+        return self.vectores()[[self.indice[c] for c in claves]].astype(np.float32)
+
+    def vectores(self):
+        """Vista memory-mapped (solo lectura) de todos los embeddings guardados."""
+        if not self.indice:
+            return np.zeros((0, self.dimension), dtype=np.float16)
+        return np.memmap(self.ruta_vectores, dtype=np.float16, mode='r', shape=(len(self.indice), self.dimension))
+
+
+class CachePuntajes:
+    """
+    Puntajes del cross-encoder persistentes por (hash texto A, hash texto B, modelo).
+    Vive en un SQLite dentro de la carpeta de caché; se escribe por tandas.
+    """
+
+    def __init__(self, nombre_modelo, carpeta=CARPETA_CACHE):
+        self.nombre_modelo = nombre_modelo
+        os.makedirs(carpeta, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(carpeta, 'puntajes_cross.db'))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS puntajes (
+                hash_a TEXT NOT NULL,
+                hash_b TEXT NOT NULL,
+                modelo TEXT NOT NULL,
+                puntaje REAL NOT NULL,
+                PRIMARY KEY (hash_a, hash_b, modelo)
+            ) WITHOUT ROWID
+        """)
+
+    def buscar(self, claves):
+        """Recibe pares (hash_a, hash_b); devuelve {par: puntaje} con los que ya estaban."""
+        encontrados = {}
+        claves = list(claves)
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS consulta (hash_a TEXT, hash_b TEXT)")
+            self.conn.execute("DELETE FROM temp.consulta")
+            self.conn.executemany("INSERT INTO temp.consulta VALUES (?, ?)", claves)
+            for hash_a, hash_b, puntaje in self.conn.execute("""
+                SELECT p.hash_a, p.hash_b, p.puntaje
+                FROM temp.consulta c
+                JOIN puntajes p ON p.hash_a = c.hash_a AND p.hash_b = c.hash_b AND p.modelo = ?
+            """, (self.nombre_modelo,)):
+                encontrados[(hash_a, hash_b)] = puntaje
+        return encontrados
+
+    def guardar(self, claves, puntajes):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO puntajes VALUES (?, ?, ?, ?)",
+                [(a, b, self.nombre_modelo, float(p)) for (a, b), p in zip(claves, puntajes)]
+            )
+
+    def cerrar(self):
+        self.conn.close()
@@ -1,12 +1,48 @@
+import os
+import sys
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
+# normalizacion.py vive en la raíz del repo (compartido con los scrapers)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalizacion import normalizar_serie
+
 # NOMBRES DE TUS ARCHIVOS (Asegúrate que coincidan)
 ARCHIVO_PEQUENO = './data/actividades_triviantes.csv' # Tu archivo de 200
 ARCHIVO_GRANDE = './data/colombia_civitatis_20260129_140055.csv' # Tu archivo de 1000
 
+# Filas del archivo pequeño por producto disperso (acota la memoria del respaldo sin bloque)
+TAMANO_LOTE = 2000
+
+
+def top_k_disperso(matriz_a, matriz_b, k=1, tamano_lote=TAMANO_LOTE):
+    """
+    Top-k por fila de matriz_a · matriz_bᵀ sin pasar nunca a denso.
+    Las filas de TF-IDF ya vienen normalizadas (L2), así que el producto es el coseno.
+    Devuelve (indices, puntajes) de forma (filas_a, k); -1 donde no hay coincidencia.
+    """
+    n_filas = matriz_a.shape[0]
+    indices = np.full((n_filas, k), -1, dtype=np.int64)
+    puntajes = np.zeros((n_filas, k), dtype=np.float64)
+    matriz_bt = matriz_b.T.tocsc()
+
+    for inicio in range(0, n_filas, tamano_lote):
+        sims = (matriz_a[inicio:inicio + tamano_lote] @ matriz_bt).tocsr()
+        for fila in range(sims.shape[0]):
+            desde, hasta = sims.indptr[fila], sims.indptr[fila + 1]
+            if desde == hasta:
+                continue
+            valores = sims.data[desde:hasta]
+            columnas = sims.indices[desde:hasta]
+            n = min(k, len(valores))
+            mejores = np.argpartition(-valores, n - 1)[:n]
+            mejores = mejores[np.argsort(-valores[mejores], kind='stable')]
+            indices[inicio + fila, :n] = columnas[mejores]
+            puntajes[inicio + fila, :n] = valores[mejores]
+
+    return indices, puntajes
+
 def cruzar_archivos():
     print("Cargando archivos...")
     try:
@@ -34,37 +70,55 @@ def cruzar_archivos():
     tfidf_1 = vectorizer.transform(df1['actividad'])
     tfidf_2 = vectorizer.transform(df2['actividad'])
     
-    # Calculamos similitud
-    cosine_sim = cosine_similarity(tfidf_1, tfidf_2)
-    
-    resultados = []
-    
+    # Bloqueo: cada actividad solo se compara con las del mismo destino normalizado.
+    # Las que no tienen destino (o cuyo destino no existe en el otro archivo) van contra todo df2
+    bloques_1 = normalizar_serie(df1['destino']) if 'destino' in df1.columns else pd.Series('', index=df1.index)
+    bloques_2 = normalizar_serie(df2['destino']) if 'destino' in df2.columns else pd.Series('', index=df2.index)
+    filas_por_bloque = {clave: np.flatnonzero(bloques_2.values == clave) for clave in bloques_2.unique()}
+
+    # Igual que el argmax original: sin ninguna coincidencia queda el primer candidato con 0%
+    best_idx = np.zeros(len(df1), dtype=np.int64)
+    best_score = np.zeros(len(df1))
+
+    sin_bloque = []
+    for clave, filas_1 in pd.Series(np.arange(len(df1))).groupby(bloques_1.values):
+        filas_2 = filas_por_bloque.get(clave)
+        if not clave or filas_2 is None:
+            sin_bloque.extend(filas_1)
+            continue
+        indices, puntajes = top_k_disperso(tfidf_1[filas_1.values], tfidf_2[filas_2])
+        encontrados = indices[:, 0] >= 0
+        best_idx[filas_1.values] = np.where(encontrados, filas_2[indices[:, 0]], filas_2[0])
+        best_score[filas_1.values] = puntajes[:, 0]
+
+    if sin_bloque:
+        print(f"   ↳ {len(sin_bloque)} actividades sin destino en común: se comparan contra todo el archivo grande")
+        sin_bloque = np.array(sin_bloque)
+        indices, puntajes = top_k_disperso(tfidf_1[sin_bloque], tfidf_2)
+        best_idx[sin_bloque] = np.maximum(indices[:, 0], 0)
+        best_score[sin_bloque] = puntajes[:, 0]
+
     print(f"Procesando {len(df1)} actividades...")
-    
-    for idx, row in df1.iterrows():
-        # Obtenemos los puntajes de similitud para la fila actual
-        sim_scores = cosine_sim[idx]
-        
-        # Buscamos el mejor candidato
-        best_idx = np.argmax(sim_scores)
-        best_score = sim_scores[best_idx]
-        
-        match_row = df2.iloc[best_idx]
-        
-        resultados.append({
-            'Destino': row.get('destino', ''),
-            'Actividad_Triviantes': row['actividad'],
-            'Precio_Triviantes': row.get('precio_real', ''),
-            'Actividad_Civitatis': match_row['actividad'],
-            'Precio_Civitatis': match_row.get('precio_real', ''),
-            'Similitud_%': round(best_score * 100, 2),
-            'Url_Match': match_row.get('url_fuente', ''), # Agregué la URL por si quieres verificar
-            'Cantidad_Viajeros': match_row['viajeros']
-        })
+
+    # Armado de filas vectorizado (sin iterrows)
+    def columna(df, nombre, filas=None):
+        if nombre not in df.columns:
+            return ''
+        valores = df[nombre].values
+        return valores if filas is None else valores[filas]
+
+    df_final = pd.DataFrame({
+        'Destino': columna(df1, 'destino'),
+        'Actividad_Triviantes': df1['actividad'].values,
+        'Precio_Triviantes': columna(df1, 'precio_real'),
+        'Actividad_Civitatis': df2['actividad'].values[best_idx],
+        'Precio_Civitatis': columna(df2, 'precio_real', best_idx),
+        'Similitud_%': np.round(best_score * 100, 2),
+        'Url_Match': columna(df2, 'url_fuente', best_idx), # Agregué la URL por si quieres verificar
+        'Cantidad_Viajeros': df2['viajeros'].values[best_idx]
+    })
 
     # Guardar archivo final
-    df_final = pd.DataFrame(resultados)
-    
     # Ordenamos: primero los matches más seguros
     df_final = df_final.sort_values(by='Similitud_%', ascending=False)
     
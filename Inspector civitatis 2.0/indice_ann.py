@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+
+# normalizacion.py vive en la raíz del repo (compartido con los scrapers)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalizacion import normalizar_texto
+
+try:
+    import hnswlib
+except ImportError:  # Sin hnswlib se usa búsqueda exacta por partición
+    hnswlib = None
+
+# Los índices se guardan junto a la caché de embeddings
+CARPETA_ANN = './cache_embeddings/ann'
+
+# Partición de respaldo con todo el corpus (destinos que no existen del otro lado)
+PARTICION_GLOBAL = '__todas__'
+
+# Por debajo de este tamaño la búsqueda exacta es más rápida que construir un HNSW
+MIN_ELEMENTOS_HNSW = 2000
+
+# Parámetros HNSW: M = vecinos por nodo, ef = amplitud de búsqueda
+HNSW_M = 32
+HNSW_EF_CONSTRUCCION = 200
+HNSW_EF_BUSQUEDA = 128
+
+# Versión del formato guardado: los índices de otra versión se reconstruyen
+# (v2: etiquetas = posición dentro de la partición, no fila global del corpus)
+VERSION_INDICE = 2
+
+
+def clave_particion(destino):
+    return normalizar_texto(destino)
+
+
+def _normalizar_filas(matriz):
+    matriz = np.asarray(matriz, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+class IndiceANN:
+    """
+    Índice de vecinos más cercanos (coseno) sobre el corpus, particionado por destino.
+
+    Cada partición es un HNSW (hnswlib) guardado en disco y reutilizado mientras
+    el contenido de la partición no cambie (firma = hashes de los textos). Las
+    etiquetas del HNSW son posiciones locales dentro de la partición y se traducen
+    a filas del corpus al buscar, así que mover filas de otros destinos no invalida
+    un índice guardado. Las
+    particiones chicas, o todas si hnswlib no está instalado, usan búsqueda exacta
+    limitada a esa partición: nunca se arma una matriz N×M completa.
+    """
+
+    def __init__(self, nombre, embeddings, particiones, claves_textos, carpeta=CARPETA_ANN):
+        self.embeddings = embeddings
+        self.dimension = embeddings.shape[1]
+        self.carpeta = os.path.join(carpeta, nombre)
+        os.makedirs(self.carpeta, exist_ok=True)
+
+        grupos = {}
+        for fila, particion in enumerate(particiones):
+            grupos.setdefault(clave_particion(particion), []).append(fila)
+        self.grupos = {clave: np.array(filas) for clave, filas in grupos.items()}
+        self.grupos[PARTICION_GLOBAL] = np.arange(len(particiones))
+
+        self.claves_textos = claves_textos
+        self._cargados = {}
+
+    def _firma(self, filas):
+        h = hashlib.blake2b(digest_size=16)
+        for fila in filas:
+            h.update(self.claves_textos[fila].encode('utf-8'))
+        return h.hexdigest()
+
+    def _indice(self, clave):
+        """HNSW de la partición (construido o leído de disco), o None si va por búsqueda exacta."""
+        if clave in self._cargados:
+            return self._cargados[clave]
+
+        filas = self.grupos[clave]
+        indice = None
+        if hnswlib is not None and len(filas) >= MIN_ELEMENTOS_HNSW:
+            base = os.path.join(self.carpeta, hashlib.blake2b(clave.encode('utf-8'), digest_size=8).hexdigest())
+            ruta_indice, ruta_meta = base + '.bin', base + '.json'
+            firma = self._firma(filas)
+
+            indice = hnswlib.Index(space='cosine', dim=self.dimension)
+            meta = None
+            if os.path.exists(ruta_meta) and os.path.exists(ruta_indice):
+                with open(ruta_meta, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+
+            if meta and meta.get('firma') == firma and meta.get('version') == VERSION_INDICE:
+                indice.load_index(ruta_indice, max_elements=len(filas))
+            else:
+                print(f"   ↳ Construyendo índice HNSW '{clave}' ({len(filas)} actividades)...")
+                indice.init_index(max_elements=len(filas), ef_construction=HNSW_EF_CONSTRUCCION, M=HNSW_M)
+                indice.add_items(_normalizar_filas(self.embeddings[filas]), np.arange(len(filas)))
+                indice.save_index(ruta_indice)
+                with open(ruta_meta, 'w', encoding='utf-8') as f:
+                    json.dump({'particion': clave, 'elementos': len(filas), 'firma': firma,
+                               'version': VERSION_INDICE}, f)
+            indice.set_ef(HNSW_EF_BUSQUEDA)
+
+        self._cargados[clave] = indice
+        return indice
+
+    def buscar(self, consultas, particiones_consulta, top_k=50):
+        """
+        Mismo formato que util.semantic_search: por cada consulta una lista de
+        {'corpus_id', 'score'} ordenada de mayor a menor score.
+        """
+        consultas = _normalizar_filas(consultas)
+        resultados = [[] for _ in range(len(consultas))]
+
+        por_particion = {}
+        for i, particion in enumerate(particiones_consulta):
+            clave = clave_particion(particion)
+            if clave not in self.grupos:
+                clave = PARTICION_GLOBAL
+            por_particion.setdefault(clave, []).append(i)
+
+        for clave, idx_consultas in por_particion.items():
+            filas = self.grupos[clave]
+            k = min(top_k, len(filas))
+            bloque = consultas[idx_consultas]
+            indice = self._indice(clave)
+
+            if indice is not None:
+                posiciones, distancias = indice.knn_query(bloque, k=k)
+                etiquetas = filas[posiciones.astype(np.int64)]
+                puntajes = 1.0 - distancias
+            else:
+                etiquetas, puntajes = self._buscar_exacto(bloque, filas, k)
+
+            for i, fila_etiquetas, fila_puntajes in zip(idx_consultas, etiquetas, puntajes):
+                resultados[i] = [
+                    {'corpus_id': int(e), 'score': float(p)} for e, p in zip(fila_etiquetas, fila_puntajes)
+                ]
+
+        return resultados
+
+    def _buscar_exacto(self, bloque, filas, k, tamano_lote=1024):
+        """Top-k exacto contra una partición, por lotes de consultas para acotar memoria."""
+        corpus = _normalizar_filas(self.embeddings[filas])
+        etiquetas, puntajes = [], []
+        for inicio in range(0, len(bloque), tamano_lote):
+            sims = bloque[inicio:inicio + tamano_lote] @ corpus.T
+            mejores = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            valores = np.take_along_axis(sims, mejores, axis=1)
+            orden = np.argsort(-valores, axis=1)
+            etiquetas.append(filas[np.take_along_axis(mejores, orden, axis=1)])
+            puntajes.append(np.take_along_axis(valores, orden, axis=1))
+        return np.vstack(etiquetas), np.vstack(puntajes)
@@ -0,0 +1,337 @@
+"""
+Motor de cruce de actividades entre dos archivos (p. ej. Triviantes vs Civitatis).
+
+Junta en un solo pipeline lo que hacían cruce_actividades.py (TF-IDF),
+activity_compare.py (MiniLM) y algoritmo_similitud.py (e5 + cross-encoder + húngaro):
+
+    bloqueo -> candidatos -> re-ranking -> asignación
+
+Cada etapa se elige por nombre (perfil o flags) y todas comparten los datos
+cargados y las cachés de modelos. Al final se imprime tiempo y memoria por etapa.
+
+Uso:
+    python "Inspector civitatis 2.0/motor_cruce.py" data/a.csv data/b.csv --perfil preciso
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from asignacion import asignar_por_componentes
+from indice_ann import PARTICION_GLOBAL
+
+# normalizacion.py vive en la raíz del repo (compartido con los scrapers)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalizacion import normalizar_serie
+
+# Cada perfil es una combinación de etapas; de más rápido a más preciso
+PERFILES = {
+    'rapido': {'bloqueo': 'destino', 'candidatos': 'tfidf', 'reranking': 'ninguno', 'asignacion': 'mejor'},
+    'semantico': {'bloqueo': 'destino', 'candidatos': 'minilm', 'reranking': 'ninguno', 'asignacion': 'mejor'},
+    'preciso': {'bloqueo': 'destino', 'candidatos': 'e5', 'reranking': 'cross', 'asignacion': 'hungaro'},
+}
+
+MODELO_MINILM = 'paraphrase-multilingual-MiniLM-L12-v2'
+MODELO_E5 = 'intfloat/multilingual-e5-large'
+MODELO_CROSS = 'cross-encoder/ms-marco-MiniLM-L12-v2'
+
+# Filtro de seguridad de algoritmo_similitud.py: parejas del húngaro con puntaje
+# del cross-encoder por debajo de esto se descartan
+PUNTAJE_MINIMO_HUNGARO = -10
+
+
+class Contexto:
+    """Datos y recursos compartidos entre etapas (se cargan una sola vez)."""
+
+    def __init__(self, df_a, df_b, nombre_b, col_destino, col_actividad, top_k):
+        self.df_a = df_a
+        self.df_b = df_b
+        self.nombre_b = nombre_b
+        self.col_destino = col_destino
+        self.col_actividad = col_actividad
+        self.top_k = top_k
+        self.bloques_a = None
+        self.bloques_b = None
+        self._modelos = {}
+
+    def modelo(self, nombre, fabrica):
+        if nombre not in self._modelos:
+            print(f"   ↳ Cargando modelo {nombre}...")
+            self._modelos[nombre] = fabrica(nombre)
+        return self._modelos[nombre]
+
+    def actividades(self, df):
+        return df[self.col_actividad].fillna('').astype(str).tolist()
+
+    def textos_enriquecidos(self, df):
+        # Mismo texto que algoritmo_similitud.py: prefijo "query: " en los dos lados y
+        # valores vacíos como 'nan', así ambos scripts comparten la caché de embeddings
+        descripcion = df['descripcion'].astype(str) if 'descripcion' in df.columns else ''
+        destino = df[self.col_destino].astype(str) if self.col_destino in df.columns else ''
+        combinado = destino + " - " + df[self.col_actividad].astype(str) + ". Contexto: " + descripcion
+        return ("query: " + combinado).tolist()
+
+
+# --- MEDICIÓN ---
+
+class Medidor:
+    """
+    Tiempo (perf_counter) y RSS máximo del proceso al terminar cada etapa.
+    Con memoria_python=True también mide el pico de tracemalloc, que frena bastante
+    el código Python: sirve para comparar memoria, no tiempos.
+    """
+
+    def __init__(self, memoria_python=False):
+        self.memoria_python = memoria_python
+        self.etapas = []
+
+    @contextmanager
+    def etapa(self, nombre):
+        print(f"\n▶ Etapa: {nombre}")
+        if self.memoria_python:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            pico = None
+            if self.memoria_python:
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            self.etapas.append({
+                'etapa': nombre,
+                'segundos': round(segundos, 3),
+                'pico_python_mb': round(pico / 1024 ** 2, 1) if pico is not None else None,
+                'rss_max_mb': round(_rss_max_mb(), 1),
+            })
+
+    def resumen(self):
+        print("\n📊 Tiempo y memoria por etapa")
+        print(f"{'etapa':<12} {'segundos':>10} {'pico py MB':>11} {'RSS máx MB':>11}")
+        for e in self.etapas:
+            pico = '-' if e['pico_python_mb'] is None else f"{e['pico_python_mb']:.1f}"
+            print(f"{e['etapa']:<12} {e['segundos']:>10.3f} {pico:>11} {e['rss_max_mb']:>11.1f}")
+        print(f"{'total':<12} {sum(e['segundos'] for e in self.etapas):>10.3f}")
+
+
+def _rss_max_mb():
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / 1024 ** 2 if sys.platform == 'darwin' else maximo / 1024
+
+
+# --- ETAPA 1: BLOQUEO ---
+
+def bloqueo_destino(ctx):
+    """Clave de destino normalizada por fila; '' = sin destino (se compara contra todo)."""
+    for lado, df in (('a', ctx.df_a), ('b', ctx.df_b)):
+        if ctx.col_destino in df.columns:
+            claves = normalizar_serie(df[ctx.col_destino]).values
+        else:
+            claves = np.full(len(df), '', dtype=object)
+        setattr(ctx, f'bloques_{lado}', claves)
+    print(f"   ↳ {len(set(ctx.bloques_a) & set(ctx.bloques_b) - {''})} destinos en común")
+
+
+def bloqueo_ninguno(ctx):
+    """Sin bloques: cada actividad de A se compara contra todo B."""
+    ctx.bloques_a = np.full(len(ctx.df_a), '', dtype=object)
+    ctx.bloques_b = np.full(len(ctx.df_b), '', dtype=object)
+
+
+# --- ETAPA 2: CANDIDATOS (devuelven pares dispersos i, j, puntaje) ---
+
+def candidatos_tfidf(ctx):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from cruce_actividades import top_k_disperso
+
+    act_a, act_b = ctx.actividades(ctx.df_a), ctx.actividades(ctx.df_b)
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 4))
+    vectorizer.fit(pd.unique(np.array(act_a + act_b, dtype=object)))
+    tfidf_a, tfidf_b = vectorizer.transform(act_a), vectorizer.transform(act_b)
+
+    filas_por_bloque = {clave: np.flatnonzero(ctx.bloques_b == clave) for clave in set(ctx.bloques_b)}
+    pares_i, pares_j, pares_score = [], [], []
+    sin_bloque = []
+
+    def agregar(filas_a, filas_b, indices, puntajes):
+        validos = indices >= 0
+        pares_i.append(np.repeat(filas_a, indices.shape[1])[validos.ravel()])
+        pares_j.append(filas_b[indices[validos]])
+        pares_score.append(puntajes[validos])
+
+    for clave in set(ctx.bloques_a):
+        filas_a = np.flatnonzero(ctx.bloques_a == clave)
+        filas_b = filas_por_bloque.get(clave)
+        if not clave or filas_b is None:
+            sin_bloque.append(filas_a)
+            continue
+        indices, puntajes = top_k_disperso(tfidf_a[filas_a], tfidf_b[filas_b], k=ctx.top_k)
+        agregar(filas_a, filas_b, indices, puntajes)
+
+    if sin_bloque:
+        filas_a = np.concatenate(sin_bloque)
+        indices, puntajes = top_k_disperso(tfidf_a[filas_a], tfidf_b, k=ctx.top_k)
+        agregar(filas_a, np.arange(len(act_b)), indices, puntajes)
+
+    return np.concatenate(pares_i), np.concatenate(pares_j), np.concatenate(pares_score)
+
+
+def _candidatos_bi_encoder(ctx, nombre_modelo, prefijo_indice, textos_a, textos_b):
+    from sentence_transformers import SentenceTransformer
+    from cache_modelos import CacheEmbeddings, hash_texto
+    from indice_ann import IndiceANN
+
+    cache = CacheEmbeddings(ctx.modelo(nombre_modelo, SentenceTransformer), nombre_modelo)
+    emb_a = cache.encode(textos_a)
+    emb_b = cache.encode(textos_b)
+
+    nombre_indice = prefijo_indice + os.path.splitext(os.path.basename(ctx.nombre_b))[0]
+    indice = IndiceANN(nombre_indice, emb_b, ctx.bloques_b, [hash_texto(t) for t in textos_b])
+    hits = indice.buscar(emb_a, [clave or PARTICION_GLOBAL for clave in ctx.bloques_a], top_k=ctx.top_k)
+
+    pares_i = np.array([i for i, hit_list in enumerate(hits) for _ in hit_list], dtype=np.int64)
+    pares_j = np.array([h['corpus_id'] for hit_list in hits for h in hit_list], dtype=np.int64)
+    pares_score = np.array([h['score'] for hit_list in hits for h in hit_list], dtype=np.float64)
+    return pares_i, pares_j, pares_score
+
+
+def candidatos_minilm(ctx):
+    return _candidatos_bi_encoder(ctx, MODELO_MINILM, 'minilm_',
+                                  ctx.actividades(ctx.df_a), ctx.actividades(ctx.df_b))
+
+
+def candidatos_e5(ctx):
+    return _candidatos_bi_encoder(ctx, MODELO_E5, 'e5_',
+                                  ctx.textos_enriquecidos(ctx.df_a), ctx.textos_enriquecidos(ctx.df_b))
+
+
+# --- ETAPA 3: RE-RANKING ---
+
+def reranking_ninguno(ctx, pares_i, pares_j, pares_score):
+    return pares_score
+
+
+def reranking_cross(ctx, pares_i, pares_j, pares_score):
+    from sentence_transformers import CrossEncoder
+    from reranking import puntuar_pares
+
+    modelo = ctx.modelo(MODELO_CROSS, lambda nombre: CrossEncoder(nombre, max_length=512))
+    textos_a = ctx.textos_enriquecidos(ctx.df_a)
+    textos_b = ctx.textos_enriquecidos(ctx.df_b)
+    return puntuar_pares(modelo, MODELO_CROSS, [[textos_a[i], textos_b[j]] for i, j in zip(pares_i, pares_j)])
+
+
+# --- ETAPA 4: ASIGNACIÓN ---
+
+def asignacion_mejor(ctx, pares_i, pares_j, pares_score):
+    """Mejor candidato por fila de A (puede repetir actividades de B)."""
+    if len(pares_i) == 0:
+        return []
+    orden = np.lexsort((-pares_score, pares_i))
+    primero = np.ones(len(orden), dtype=bool)
+    primero[1:] = pares_i[orden][1:] != pares_i[orden][:-1]
+    elegidos = orden[primero]
+    return list(zip(pares_i[elegidos].tolist(), pares_j[elegidos].tolist(), pares_score[elegidos].tolist()))
+
+
+def asignacion_hungaro(ctx, pares_i, pares_j, pares_score):
+    """Parejas únicas 1 a 1 (máxima suma de puntajes) por componentes conexas."""
+    asignaciones = asignar_por_componentes(pares_i, pares_j, pares_score, len(ctx.df_a), len(ctx.df_b))
+    return [(i, j, score) for i, j, score in asignaciones if score > PUNTAJE_MINIMO_HUNGARO]
+
+
+ETAPAS = {
+    'bloqueo': {'destino': bloqueo_destino, 'ninguno': bloqueo_ninguno},
+    'candidatos': {'tfidf': candidatos_tfidf, 'minilm': candidatos_minilm, 'e5': candidatos_e5},
+    'reranking': {'ninguno': reranking_ninguno, 'cross': reranking_cross},
+    'asignacion': {'mejor': asignacion_mejor, 'hungaro': asignacion_hungaro},
+}
+
+
+def armar_resultado(ctx, asignaciones, col_precio):
+    if not asignaciones:
+        return pd.DataFrame()
+    filas_a, filas_b, puntajes = (np.array(x) for x in zip(*asignaciones))
+
+    def columna(df, nombre, filas):
+        return df[nombre].values[filas] if nombre in df.columns else ''
+
+    df_res = pd.DataFrame({
+        'destino': columna(ctx.df_a, ctx.col_destino, filas_a),
+        'actividad_a': columna(ctx.df_a, ctx.col_actividad, filas_a),
+        'precio_a': columna(ctx.df_a, col_precio, filas_a),
+        'destino_b': columna(ctx.df_b, ctx.col_destino, filas_b),
+        'actividad_b': columna(ctx.df_b, ctx.col_actividad, filas_b),
+        'precio_b': columna(ctx.df_b, col_precio, filas_b),
+        'puntaje': np.round(puntajes.astype(float), 4),
+    })
+    return df_res.sort_values(by='puntaje', ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cruce de actividades entre dos archivos por etapas.")
+    parser.add_argument('archivo_a', help="Archivo a cruzar (p. ej. actividades de Triviantes)")
+    parser.add_argument('archivo_b', help="Archivo de referencia (p. ej. catálogo de Civitatis)")
+    parser.add_argument('--perfil', choices=sorted(PERFILES), default='rapido')
+    parser.add_argument('--bloqueo', choices=sorted(ETAPAS['bloqueo']), help="Reemplaza la etapa del perfil")
+    parser.add_argument('--candidatos', choices=sorted(ETAPAS['candidatos']), help="Reemplaza la etapa del perfil")
+    parser.add_argument('--reranking', choices=sorted(ETAPAS['reranking']), help="Reemplaza la etapa del perfil")
+    parser.add_argument('--asignacion', choices=sorted(ETAPAS['asignacion']), help="Reemplaza la etapa del perfil")
+    parser.add_argument('--top-k', type=int, default=50, help="Candidatos por actividad")
+    parser.add_argument('--col-destino', default='destino')
+    parser.add_argument('--col-actividad', default='actividad')
+    parser.add_argument('--col-precio', default='precio_real')
+    parser.add_argument('--salida', default='cruce_motor.csv')
+    parser.add_argument('--reporte', help="JSON opcional con las métricas por etapa")
+    parser.add_argument('--memoria-python', action='store_true', help="Mide también el pico con tracemalloc (más lento)")
+    args = parser.parse_args()
+
+    etapas = dict(PERFILES[args.perfil])
+    for nombre in ETAPAS:
+        if getattr(args, nombre):
+            etapas[nombre] = getattr(args, nombre)
+    print(f"🚀 Perfil '{args.perfil}': " + " -> ".join(f"{k}={v}" for k, v in etapas.items()))
+
+    medidor = Medidor(args.memoria_python)
+
+    with medidor.etapa('carga'):
+        df_a = pd.read_csv(args.archivo_a)
+        df_b = pd.read_csv(args.archivo_b)
+        print(f"   ↳ A: {len(df_a)} filas | B: {len(df_b)} filas")
+    ctx = Contexto(df_a, df_b, args.archivo_b, args.col_destino, args.col_actividad, args.top_k)
+
+    with medidor.etapa('bloqueo'):
+        ETAPAS['bloqueo'][etapas['bloqueo']](ctx)
+
+    with medidor.etapa('candidatos'):
+        pares_i, pares_j, pares_score = ETAPAS['candidatos'][etapas['candidatos']](ctx)
+        print(f"   ↳ {len(pares_i)} pares candidatos")
+
+    with medidor.etapa('reranking'):
+        pares_score = np.asarray(ETAPAS['reranking'][etapas['reranking']](ctx, pares_i, pares_j, pares_score), dtype=np.float64)
+
+    with medidor.etapa('asignacion'):
+        asignaciones = ETAPAS['asignacion'][etapas['asignacion']](ctx, pares_i, pares_j, pares_score)
+
+    with medidor.etapa('salida'):
+        df_res = armar_resultado(ctx, asignaciones, args.col_precio)
+        df_res.to_csv(args.salida, index=False, encoding='utf-8-sig')
+        print(f"   ↳ {len(df_res)} parejas guardadas en {args.salida}")
+
+    medidor.resumen()
+    if args.reporte:
+        with open(args.reporte, 'w', encoding='utf-8') as f:
+            json.dump({'perfil': args.perfil, 'etapas_elegidas': etapas, 'metricas': medidor.etapas}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import numpy as np
+from tqdm import tqdm
+from cache_modelos import CachePuntajes, hash_texto
+
+# Pares por tanda: cada tanda se predice de una vez y se guarda en la caché
+TAMANO_TANDA = 4096
+# Lote interno del cross-encoder; como los pares van ordenados por largo, casi no hay padding
+TAMANO_LOTE = 64
+
+
+def usar_todos_los_nucleos():
+    """Por defecto torch no siempre toma todos los núcleos de la máquina."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(os.cpu_count() or 1)
+
+
+def puntuar_pares(cross_model, nombre_modelo, pares_textos, tamano_tanda=TAMANO_TANDA, tamano_lote=TAMANO_LOTE):
+    """
+    Puntúa con el cross-encoder todos los pares (texto_a, texto_b) de una sola vez.
+
+    - Los pares ya puntuados (mismo texto normalizado y mismo modelo) salen de la caché.
+    - Los pares nuevos se deduplican, se ordenan por largo (lotes de tamaño parecido,
+      poco padding) y se predicen en tandas grandes que se van guardando en disco,
+      así un corte a mitad no pierde lo ya calculado.
+
+    Devuelve un np.ndarray float32 con un puntaje por par, en el orden recibido.
+    """
+    usar_todos_los_nucleos()
+    cache = CachePuntajes(nombre_modelo)
+
+    claves = [(hash_texto(a), hash_texto(b)) for a, b in pares_textos]
+    en_cache = cache.buscar(set(claves))
+
+    faltantes = {}
+    for clave, par in zip(claves, pares_textos):
+        if clave not in en_cache and clave not in faltantes:
+            faltantes[clave] = par
+
+    print(f"   ↳ Pares: {len(claves)} | Ya puntuados en caché: {len(en_cache)} | Nuevos a puntuar: {len(faltantes)}")
+
+    # Bucketing por largo: pares de largo parecido terminan en el mismo lote
+    pendientes = sorted(faltantes.items(), key=lambda item: len(item[1][0]) + len(item[1][1]))
+
+    try:
+        with tqdm(total=len(pendientes), desc="Re-ranking", unit="par") as barra:
+            for inicio in range(0, len(pendientes), tamano_tanda):
+                tanda = pendientes[inicio:inicio + tamano_tanda]
+                scores = cross_model.predict(
+                    [list(par) for _, par in tanda], batch_size=tamano_lote, show_progress_bar=False
+                )
+                claves_tanda = [clave for clave, _ in tanda]
+                cache.guardar(claves_tanda, scores)
+                en_cache.update(zip(claves_tanda, (float(s) for s in scores)))
+                barra.update(len(tanda))
+    finally:
+        cache.cerrar()
+
+    return np.array([en_cache[clave] for clave in claves], dtype=np.float32)
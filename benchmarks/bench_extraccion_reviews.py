@@ -0,0 +1,94 @@
+"""
+Benchmark de la lectura de opiniones de una página de Civitatis.
+
+    python benchmarks/bench_extraccion_reviews.py [pagina.html]
+
+El fixture por defecto (fixtures/opiniones_sinteticas.html) es marcado sintético
+con las clases de los selectores, no una página real: para números que valgan
+sobre el sitio, pasar una página de opiniones guardada desde el navegador.
+
+Casos:
+  1. Navegador (Playwright + Chromium): el bucle anterior, con query_selector e
+     inner_text por opinión (~4 idas y vueltas al navegador cada una), vs
+     leer_reviews_pagina (un solo page.evaluate por página).
+  2. Sin navegador: parsear_reviews_html sobre el HTML de la página (lo que usa
+     reviews_destino.py para la página 1 y las páginas pedidas por HTTP).
+"""
+import asyncio
+import os
+import sys
+import time
+import timeit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from extraccion_reviews import parsear_reviews_html, leer_reviews_pagina
+
+FIXTURE = os.path.join(RAIZ, 'benchmarks', 'fixtures', 'opiniones_sinteticas.html')
+REPETICIONES = 20
+
+SELECTORES = {
+    "review_container": ".o-container-opiniones-small",
+    "location": ".opi-location",
+    "date_text": ".a-opiniones-date",
+}
+
+
+# --- Versión anterior (copiada de reviews.py para comparar) ---
+
+async def leer_por_elemento(page):
+    reviews = []
+    for el in await page.query_selector_all(SELECTORES["review_container"]):
+        date_el = await el.query_selector(SELECTORES["date_text"])
+        date_text = await date_el.inner_text() if date_el else ""
+        loc_el = await el.query_selector(SELECTORES["location"])
+        raw_loc = await loc_el.inner_text() if loc_el else None
+        reviews.append({'date_text': date_text, 'location_text': raw_loc})
+    return reviews
+
+
+async def medir_async(nombre, funcion):
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = await funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    print(f"  {nombre:<28} {min(tiempos) * 1000:>10.2f} ms")
+    return min(tiempos), resultado
+
+
+async def bench_navegador(texto_html):
+    try:
+        from playwright.async_api import async_playwright
+    except ImportError:
+        print("  (Playwright no está instalado: se salta este caso)")
+        return
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.set_content(texto_html)
+        antes, previas = await medir_async("query_selector por opinión", lambda: leer_por_elemento(page))
+        ahora, nuevas = await medir_async("leer_reviews_pagina", lambda: leer_reviews_pagina(
+            page, SELECTORES["review_container"], SELECTORES["date_text"], SELECTORES["location"]))
+        await browser.close()
+
+    print(f"  -> {antes / ahora:.1f}x | mismo resultado: {'sí' if previas == nuevas else 'NO'}")
+
+
+def main():
+    ruta = sys.argv[1] if len(sys.argv) > 1 else FIXTURE
+    with open(ruta, 'r', encoding='utf-8') as f:
+        texto_html = f.read()
+    n = len(parsear_reviews_html(texto_html))
+
+    print(f"1. Navegador: {n} opiniones de {os.path.basename(ruta)}")
+    asyncio.run(bench_navegador(texto_html))
+
+    print(f"2. Sin navegador: {n} opiniones de {os.path.basename(ruta)}")
+    segundos = min(timeit.repeat(lambda: parsear_reviews_html(texto_html), number=1, repeat=REPETICIONES))
+    print(f"  {'parsear_reviews_html':<28} {segundos * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark de normalizacion.py contra las funciones que reemplazó.
+
+    python benchmarks/bench_normalizacion.py
+
+Casos:
+  1. Búsqueda de destino: normalizar todo destinos_civitatis.json en cada consulta
+     (como hacía cargar_destino_civitatis) vs la caché LRU.
+  2. Columna de operadores: .apply(limpiar_texto) vs normalizar_serie.
+"""
+import json
+import os
+import sys
+import timeit
+import unicodedata
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalizacion import normalizar_texto, normalizar_serie, _normalizar
+
+ARCHIVO_DESTINOS = 'destinos_civitatis.json'
+REPETICIONES = 5
+
+
+# --- Versiones anteriores (copiadas tal cual para comparar) ---
+
+def normalizar_texto_anterior(texto):
+    if not texto: return ""
+    texto_limpio = unicodedata.normalize('NFKD', str(texto)).encode('ASCII', 'ignore').decode('utf-8')
+    return texto_limpio.lower().strip()
+
+
+def limpiar_texto_anterior(texto):
+    if pd.isna(texto):
+        return ""
+    texto = str(texto).lower().strip()
+    return unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
+
+
+def buscar_destino(todos, ciudad, normalizar):
+    ciudad = normalizar(ciudad)
+    for d in todos:
+        if normalizar(d.get('name', '')) == ciudad:
+            return d
+    for d in todos:
+        if ciudad in normalizar(d.get('name', '')):
+            return d
+    return None
+
+
+def medir(nombre, funcion):
+    # Cada repetición arranca con la caché vacía: se mide una corrida real, no una caché tibia
+    segundos = min(timeit.repeat(funcion, setup=_normalizar.cache_clear, number=1, repeat=REPETICIONES))
+    print(f"  {nombre:<28} {segundos * 1000:>10.1f} ms")
+    return segundos
+
+
+def main():
+    with open(ARCHIVO_DESTINOS, 'r', encoding='utf-8') as f:
+        todos = json.load(f)
+    nombres = [d.get('name', '') for d in todos]
+
+    # 1. Búsqueda de 200 destinos (mitad exactos, mitad por contención)
+    consultas = [n.upper() for n in nombres[::max(1, len(nombres) // 100)]][:100]
+    consultas += [n[:5] for n in nombres[1::max(1, len(nombres) // 100)]][:100]
+    print(f"1. Búsqueda de {len(consultas)} destinos en {len(todos)} ({ARCHIVO_DESTINOS})")
+    antes = medir("anterior (sin caché)", lambda: [buscar_destino(todos, c, normalizar_texto_anterior) for c in consultas])
+    ahora = medir("normalizar_texto (LRU)", lambda: [buscar_destino(todos, c, normalizar_texto) for c in consultas])
+    print(f"  -> {antes / ahora:.1f}x")
+
+    # 2. Columna con valores repetidos (un operador aparece en muchas actividades)
+    serie = pd.Series(nombres * 20)
+    print(f"2. Columna de {len(serie)} valores ({serie.nunique()} distintos)")
+    antes = medir(".apply(limpiar_texto)", lambda: serie.apply(limpiar_texto_anterior))
+    ahora = medir("normalizar_serie", lambda: normalizar_serie(serie))
+    print(f"  -> {antes / ahora:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
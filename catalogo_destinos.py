@@ -0,0 +1,114 @@
+"""
+Catálogo de destinos de Civitatis (destinos_civitatis.json) con índices en memoria.
+
+El JSON se parsea una sola vez: los destinos y sus índices (país, nombre
+normalizado y slug) se guardan en un pickle al lado del JSON y se reutilizan
+mientras el JSON no cambie (tamaño + fecha de modificación).
+"""
+import json
+import os
+import pickle
+
+from normalizacion import normalizar_texto
+
+RUTA_JSON = 'destinos_civitatis.json'
+# Subir la versión si cambia la estructura guardada en el pickle
+VERSION_CACHE = 1
+
+_catalogos = {}
+
+
+class CatalogoDestinos:
+    def __init__(self, destinos):
+        self.destinos = destinos
+        self.nombres = [normalizar_texto(d.get('name', '')) for d in destinos]
+        self.paises = [normalizar_texto(d.get('nameCountry', '')) for d in destinos]
+        self.por_pais = {}
+        self.por_nombre = {}
+        self.por_slug = {}
+        for i, (nombre, pais) in enumerate(zip(self.nombres, self.paises)):
+            self.por_pais.setdefault(pais, []).append(i)
+            self.por_nombre.setdefault(nombre, []).append(i)
+            slug = destinos[i].get('url', '')
+            if slug:
+                self.por_slug.setdefault(slug, i)
+
+    def __len__(self):
+        return len(self.destinos)
+
+    def por_paises(self, paises):
+        """Destinos de los países pedidos, en el mismo orden que el JSON."""
+        indices = sorted(i for p in {normalizar_texto(p) for p in paises} for i in self.por_pais.get(p, []))
+        return [dict(self.destinos[i]) for i in indices]
+
+    def por_url(self, slug):
+        i = self.por_slug.get(slug)
+        return dict(self.destinos[i]) if i is not None else None
+
+    def buscar(self, nombre_ciudad, nombre_pais=""):
+        """Primero nombre exacto (+ país); si no, el primero cuyo nombre contenga el texto."""
+        nombre_ciudad, nombre_pais = normalizar_texto(nombre_ciudad), normalizar_texto(nombre_pais)
+        for i in self.por_nombre.get(nombre_ciudad, []):
+            if not nombre_pais or nombre_pais == self.paises[i]:
+                return dict(self.destinos[i])
+        for i, (nombre, pais) in enumerate(zip(self.nombres, self.paises)):
+            if nombre_ciudad in nombre and (not nombre_pais or nombre_pais in pais):
+                return dict(self.destinos[i])
+        return None
+
+
+def _ruta_cache(ruta_json):
+    return os.path.splitext(ruta_json)[0] + '.pkl'
+
+
+def cargar_catalogo(ruta_json=RUTA_JSON):
+    """Devuelve el CatalogoDestinos (una vez por proceso), o None si no existe el JSON."""
+    if not os.path.exists(ruta_json):
+        print(f"❌ Error: No se encontró {ruta_json}", flush=True)
+        return None
+
+    info = os.stat(ruta_json)
+    firma = (VERSION_CACHE, info.st_size, info.st_mtime)
+    if ruta_json in _catalogos and _catalogos[ruta_json][0] == firma:
+        return _catalogos[ruta_json][1]
+
+    ruta_cache = _ruta_cache(ruta_json)
+    catalogo = None
+    if os.path.exists(ruta_cache):
+        try:
+            with open(ruta_cache, 'rb') as f:
+                firma_guardada, catalogo = pickle.load(f)
+            if firma_guardada != firma:
+                catalogo = None
+        except Exception:
+            catalogo = None
+
+    if catalogo is None:
+        with open(ruta_json, 'r', encoding='utf-8') as f:
+            catalogo = CatalogoDestinos(json.load(f))
+        try:
+            temporal = ruta_cache + '.tmp'
+            with open(temporal, 'wb') as f:
+                pickle.dump((firma, catalogo), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta_cache)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la caché del catálogo: {e}", flush=True)
+
+    _catalogos[ruta_json] = (firma, catalogo)
+    return catalogo
+
+
+def cargar_destinos_civitatis(paises, ruta_json=RUTA_JSON):
+    """Destinos de los países indicados (sin importar mayúsculas ni tildes)."""
+    catalogo = cargar_catalogo(ruta_json)
+    return catalogo.por_paises(paises) if catalogo else []
+
+
+def buscar_destino(input_destino, ruta_json=RUTA_JSON):
+    """Busca el destino exacto cruzando la ciudad y el país ("Ciudad, País" o "Ciudad, País: ...")."""
+    catalogo = cargar_catalogo(ruta_json)
+    if not catalogo:
+        return None
+    input_limpio = input_destino.split(':')[0].strip()
+    partes = [p.strip() for p in input_limpio.split(',')]
+    return catalogo.buscar(partes[0], partes[1] if len(partes) > 1 else "")
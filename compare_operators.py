@@ -1,101 +1,249 @@
+import glob
 import pandas as pd
-import unicodedata
+import numpy as np
+from scipy.sparse import csr_matrix
+from normalizacion import normalizar_serie
 
-def limpiar_texto(texto):
+# --- CONFIGURACIÓN ---
+# Ferias: (nombre, archivo, columna con el nombre del expositor, opciones de lectura)
+FERIAS = [
+    ('WTM', 'wtm-latam-2026.csv', 'text-clamp', {'encoding': 'utf-8'}),
+    ('ANATO', 'expositores_anato_final.csv', 'Título', {'encoding': 'utf-8'}),
+]
+
+# Operadores: (plataforma, patrón de archivos, columna con el nombre, opciones de lectura)
+FUENTES_OPERADORES = [
+    ('GYG', 'gyg/metadata_latam_BQ.csv', 'proveedor', {'sep': ';', 'encoding': 'utf-8-sig'}),
+    ('Viator', 'viator/viator_con_proveedores.csv', 'Trading Name', {'encoding': 'utf-8'}),
+    ('Civitatis', 'data/operadores_*.csv', 'operador', {'sep': ';', 'encoding': 'utf-8-sig'}),
+]
+
+# Coincidencia difusa: coeficiente de Dice sobre trigramas de caracteres
+UMBRAL_DIFUSO = 0.8
+# Operadores por bloque en el producto disperso (acota la memoria)
+TAMANO_BLOQUE = 2000
+
+ARCHIVO_RESUMEN = 'resultado_cruce_ferias.csv'
+ARCHIVO_COINCIDENCIAS = 'resultado_cruce_ferias_coincidencias.csv'
+
+# Archivo de siempre: cada fila de la metadata de GYG con todas sus columnas
+# más Asiste_<feria> y Nombre_en_catalogo_<feria> por cada feria
+FUENTE_POR_FILA = 'GYG'
+ARCHIVO_POR_FILA = 'resultado_cruce_wtm.csv'
+
+# Prioridad al elegir la mejor coincidencia de cada operador
+PRIORIDAD_TIPO = {'exacto': 3, 'contenido': 2, 'difuso': 1}
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceNombres:
     """
-    Convierte el texto a minúsculas, quita espacios en los extremos 
-    y elimina los acentos (diacríticos).
+    Índice invertido de trigramas sobre los nombres de una feria (ya limpios).
+
+    Para cada consulta, el producto disperso consultas × nombres da cuántos trigramas
+    comparten. Con eso sale todo sin comparar cada par:
+      - "consulta dentro del nombre" solo es posible si comparten todos los trigramas de la consulta
+      - "nombre dentro de la consulta" solo si comparten todos los trigramas del nombre
+      - Dice = 2·comunes / (trigramas consulta + trigramas nombre)
+    Los candidatos de contención se confirman con `in` (mismo criterio LIKE que antes).
+    Los textos de menos de 3 letras no tienen trigramas y se revisan aparte.
     """
-    if pd.isna(texto):
-        return ""
-    
-    # Convertir a string, minúsculas y quitar espacios extra
-    texto = str(texto).lower().strip()
-    
-    # Quitar acentos
-    texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
-    return texto
+
+    def __init__(self, nombres):
+        self.nombres = nombres
+        self.vocabulario = {}
+        self.matriz = self._matriz(nombres, crecer=True)
+        self.tamanos = np.asarray(self.matriz.sum(axis=1)).ravel()
+        self.cortos = [k for k, n in enumerate(nombres) if 0 < len(n) < 3]
+
+    def _matriz(self, textos, crecer=False):
+        filas, columnas = [], []
+        for fila, texto in enumerate(textos):
+            for tri in trigramas(texto):
+                columna = self.vocabulario.get(tri)
+                if columna is None:
+                    if not crecer:
+                        continue
+                    columna = self.vocabulario[tri] = len(self.vocabulario)
+                filas.append(fila)
+                columnas.append(columna)
+        return csr_matrix(
+            (np.ones(len(filas), dtype=np.float32), (filas, columnas)),
+            shape=(len(textos), max(len(self.vocabulario), 1))
+        )
+
+    def buscar(self, consultas, umbral=UMBRAL_DIFUSO):
+        """Devuelve todas las coincidencias como (índice consulta, índice nombre, tipo, puntaje)."""
+        coincidencias = []
+
+        for inicio in range(0, len(consultas), TAMANO_BLOQUE):
+            bloque = consultas[inicio:inicio + TAMANO_BLOQUE]
+            tamanos_q = np.array([len(trigramas(q)) for q in bloque])
+            comunes = (self._matriz(bloque) @ self.matriz.T).tocoo()
+
+            # Filtro vectorizado: solo se revisan en Python los pares que pueden coincidir
+            dice = 2.0 * comunes.data / (tamanos_q[comunes.row] + self.tamanos[comunes.col])
+            posible_contenido = (comunes.data == tamanos_q[comunes.row]) | (comunes.data == self.tamanos[comunes.col])
+            revisar = np.flatnonzero(posible_contenido | (dice >= umbral))
+
+            for k in revisar:
+                q, n = comunes.row[k], comunes.col[k]
+                consulta, nombre = bloque[q], self.nombres[n]
+                contenido = bool(posible_contenido[k]) and (consulta in nombre or nombre in consulta)
+                if contenido or dice[k] >= umbral:
+                    coincidencias.append((inicio + q, n, _tipo(consulta, nombre, contenido), round(float(dice[k]), 4)))
+
+        # Textos sin trigramas (1-2 letras): se comparan directo, son muy pocos
+        for q, consulta in enumerate(consultas):
+            if consulta == "":
+                continue
+            if len(consulta) < 3:
+                for n, nombre in enumerate(self.nombres):
+                    if nombre and (consulta in nombre or nombre in consulta):
+                        coincidencias.append((q, n, _tipo(consulta, nombre, True), _dice(consulta, nombre)))
+            else:
+                for n in self.cortos:
+                    if self.nombres[n] in consulta:
+                        coincidencias.append((q, n, 'contenido', _dice(consulta, self.nombres[n])))
+
+        return coincidencias
+
+
+def _tipo(consulta, nombre, contenido):
+    if consulta == nombre:
+        return 'exacto'
+    return 'contenido' if contenido else 'difuso'
+
+
+def _dice(a, b):
+    if a == b:
+        return 1.0
+    ta, tb = trigramas(a), trigramas(b)
+    if not ta or not tb:
+        return 0.0
+    return round(2.0 * len(ta & tb) / (len(ta) + len(tb)), 4)
+
+
+def leer_fuente(nombre, patron, columna, opciones):
+    archivos = sorted(glob.glob(patron))
+    if not archivos:
+        print(f"⚠️ {nombre}: no se encontró {patron}. Saltando...")
+        return None
+    partes = []
+    for archivo in archivos:
+        try:
+            try:
+                df = pd.read_csv(archivo, **opciones)
+            except UnicodeDecodeError:
+                # Algún export viejo viene en latin-1 (p. ej. desde Excel)
+                df = pd.read_csv(archivo, **{**opciones, 'encoding': 'latin-1'})
+        except pd.errors.ParserError as e:
+            print(f"⚠️ {nombre}: no se pudo leer {archivo} ({e}). Saltando...")
+            continue
+        if columna not in df.columns:
+            print(f"⚠️ {nombre}: la columna '{columna}' no existe en {archivo}. Saltando...")
+            continue
+        partes.append(df)
+    if not partes:
+        return None
+    return pd.concat(partes, ignore_index=True)
+
 
 def main():
-    # 1. Cargar los archivos CSV
-    # (Asegúrate de que los nombres de los archivos sean los correctos en tu carpeta)
+    # 1. Cargar ferias y operadores
     print("Cargando archivos CSV...")
-    try:
-        df_wtm = pd.read_csv('wtm-latam-2026.csv', encoding='utf-8') 
-        df_bq = pd.read_csv('gyg/metadata_latam_BQ.csv', sep=';', encoding='utf-8-sig')
-    except FileNotFoundError as e:
-        print(f"Error: No se encontró el archivo. {e}")
-        return
+    ferias = {}
+    for nombre, archivo, columna, opciones in FERIAS:
+        df = leer_fuente(nombre, archivo, columna, opciones)
+        if df is not None:
+            ferias[nombre] = df[[columna]].rename(columns={columna: 'nombre'})
+    operadores = []
+    df_por_fila, col_por_fila = None, None
+    for plataforma, patron, columna, opciones in FUENTES_OPERADORES:
+        df = leer_fuente(plataforma, patron, columna, opciones)
+        if df is None:
+            continue
+        if plataforma == FUENTE_POR_FILA:
+            df_por_fila, col_por_fila = df, columna
+        df = df[[columna]].rename(columns={columna: 'nombre'})
+        df.insert(0, 'plataforma', plataforma)
+        operadores.append(df)
 
-    # 2. Verificar que existan las columnas
-    if 'text-clamp' not in df_wtm.columns:
-        print("Error: La columna 'text-clamp' no existe en el archivo de WTM.")
-        return
-    if 'proveedor' not in df_bq.columns:
-        print("Error: La columna 'proveedor' no existe en el archivo BQ.")
+    if not ferias or not operadores:
+        print("Error: hace falta al menos una feria y una fuente de operadores.")
         return
 
-    # 3. Limpiar los textos en ambos DataFrames creando columnas auxiliares
+    # 2. Un operador por (plataforma, nombre); en Civitatis se repite por actividad
+    df_op = pd.concat(operadores, ignore_index=True)
+    df_op['nombre'] = df_op['nombre'].fillna('').astype(str).str.strip()
+    df_op = (df_op[df_op['nombre'] != '']
+             .groupby(['plataforma', 'nombre'], sort=False).size()
+             .reset_index(name='filas_en_fuente'))
+
+    # 3. Limpiar una sola vez (minúsculas y sin acentos), sobre los nombres únicos
     print("Limpiando textos (minúsculas y sin acentos)...")
-    df_wtm['wtm_limpio'] = df_wtm['text-clamp'].apply(limpiar_texto)
-    df_bq['proveedor_limpio'] = df_bq['proveedor'].apply(limpiar_texto)
-
-    # Convertimos la lista de WTM limpia a una lista de Python para iterar rápido
-    lista_wtm = df_wtm['wtm_limpio'].tolist()
-    lista_wtm_original = df_wtm['text-clamp'].tolist()
-
-    # Listas para guardar los resultados
-    asiste_wtm = []
-    nombre_en_wtm = []
-
-    print("Realizando el cruce de datos (estilo SQL LIKE)...")
-    # 4. Iterar sobre tu base de datos para buscar coincidencias
-    for prov in df_bq['proveedor_limpio']:
-        if prov == "":
-            asiste_wtm.append("No")
-            nombre_en_wtm.append("N/A")
-            continue
-            
-        encontrado = False
-        nombre_match = "N/A"
-        
-        for i, wtm_nombre in enumerate(lista_wtm):
-            if wtm_nombre == "":
-                continue
-                
-            # Condición tipo "LIKE": revisa si el proveedor está dentro del nombre de WTM
-            # o si el nombre de WTM está dentro del nombre del proveedor
-            if (prov in wtm_nombre) or (wtm_nombre in prov):
-                encontrado = True
-                nombre_match = lista_wtm_original[i] # Guardamos cómo aparece realmente en la web
-                break # Si encuentra coincidencia, pasa al siguiente proveedor
-                
-        if encontrado:
-            asiste_wtm.append("Sí")
-            nombre_en_wtm.append(nombre_match)
-        else:
-            asiste_wtm.append("No")
-            nombre_en_wtm.append("N/A")
-
-    # 5. Agregar los resultados al DataFrame original
-    df_bq['Asiste_WTM'] = asiste_wtm
-    df_bq['Nombre_en_catalogo_WTM'] = nombre_en_wtm
-
-    # Borramos la columna auxiliar para dejar el archivo limpio
-    df_bq = df_bq.drop(columns=['proveedor_limpio'])
-
-    # 6. Guardar el resultado en un nuevo CSV
-    output_file = 'resultado_cruce_wtm.csv'
-    df_bq.to_csv(output_file, index=False, encoding='utf-8-sig')
-    
-    print(f"¡Cruce finalizado! Se ha guardado el resultado en: {output_file}")
-    
+    df_op['limpio'] = normalizar_serie(df_op['nombre'])
+    consultas = df_op['limpio'].unique().tolist()
+    posicion = {texto: k for k, texto in enumerate(consultas)}
+    print(f"- {len(df_op)} operadores ({len(consultas)} nombres distintos) en {df_op['plataforma'].nunique()} plataformas")
+
+    coincidencias = []
+    for feria, df_feria in ferias.items():
+        print(f"Realizando el cruce contra {feria} ({len(df_feria)} expositores)...")
+        originales = df_feria['nombre'].fillna('').astype(str).tolist()
+        limpios = normalizar_serie(df_feria['nombre']).tolist()
+        indice = IndiceNombres(limpios)
+
+        df_match = pd.DataFrame(indice.buscar(consultas), columns=['q', 'n', 'tipo', 'puntaje'])
+        df_match['feria'] = feria
+        df_match['nombre_feria'] = [originales[n] for n in df_match['n']]
+        coincidencias.append(df_match)
+
+    df_match = pd.concat(coincidencias, ignore_index=True)
+    df_match['limpio'] = [consultas[q] for q in df_match['q']]
+
+    # 4. Todas las coincidencias (formato largo)
+    df_todas = df_op.merge(df_match, on='limpio')[
+        ['plataforma', 'nombre', 'feria', 'nombre_feria', 'tipo', 'puntaje']
+    ].sort_values(['plataforma', 'nombre', 'feria', 'puntaje'], ascending=[True, True, True, False])
+    df_todas.to_csv(ARCHIVO_COINCIDENCIAS, index=False, encoding='utf-8-sig')
+
+    # 5. Resumen: mejor coincidencia por operador y feria (exacto > contenido > difuso, luego puntaje)
+    df_match['prioridad'] = df_match['tipo'].map(PRIORIDAD_TIPO)
+    mejores = (df_match.sort_values(['prioridad', 'puntaje'], ascending=False)
+               .drop_duplicates(['q', 'feria']))
+    mejores_por_feria = {feria: mejores[mejores['feria'] == feria].set_index('q') for feria in ferias}
+    q_op = df_op['limpio'].map(posicion)
+    for feria, m in mejores_por_feria.items():
+        df_op[f'Asiste_{feria}'] = np.where(q_op.isin(m.index), "Sí", "No")
+        df_op[f'Nombre_en_catalogo_{feria}'] = q_op.map(m['nombre_feria']).fillna("N/A")
+        df_op[f'Tipo_match_{feria}'] = q_op.map(m['tipo']).fillna("")
+        df_op[f'Score_{feria}'] = q_op.map(m['puntaje']).fillna(0.0)
+
+    df_op = df_op.drop(columns=['limpio'])
+    df_op.to_csv(ARCHIVO_RESUMEN, index=False, encoding='utf-8-sig')
+
+    # 6. Por fila de la metadata de GYG, con todas sus columnas (mismo criterio que el resumen)
+    if df_por_fila is not None:
+        q_fila = normalizar_serie(df_por_fila[col_por_fila]).map(posicion)
+        for feria, m in mejores_por_feria.items():
+            df_por_fila[f'Asiste_{feria}'] = np.where(q_fila.isin(m.index), "Sí", "No")
+            df_por_fila[f'Nombre_en_catalogo_{feria}'] = q_fila.map(m['nombre_feria']).fillna("N/A")
+        df_por_fila.to_csv(ARCHIVO_POR_FILA, index=False, encoding='utf-8-sig')
+        print(f"Detalle por fila de {FUENTE_POR_FILA} en: {ARCHIVO_POR_FILA}")
+
+    print(f"¡Cruce finalizado! Resumen en: {ARCHIVO_RESUMEN} | Todas las coincidencias en: {ARCHIVO_COINCIDENCIAS}")
+
     # Pequeño resumen
-    total = len(df_bq)
-    asisten = asiste_wtm.count("Sí")
     print(f"\nResumen:")
-    print(f"- Total de proveedores en tu lista: {total}")
-    print(f"- Proveedores encontrados en WTM: {asisten}")
+    for plataforma, grupo in df_op.groupby('plataforma', sort=False):
+        print(f"- {plataforma}: {len(grupo)} operadores")
+        for feria in ferias:
+            print(f"    · encontrados en {feria}: {(grupo[f'Asiste_{feria}'] == 'Sí').sum()}")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
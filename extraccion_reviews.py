@@ -0,0 +1,226 @@
+"""
+Extracción de opiniones de Civitatis sin navegar página por página.
+
+- parsear_reviews_html: saca fecha y ubicación de cada opinión con regex
+  sobre el HTML (sirve para la página completa o para un fragmento XHR).
+- leer_reviews_pagina: lo mismo sobre el DOM ya cargado, en un solo
+  page.evaluate (una ida y vuelta al navegador por página, no cuatro por opinión).
+- descubrir_paginacion: averigua la URL que hay detrás del botón "siguiente"
+  (href real o, si es por JavaScript, la petición XHR que dispara un click).
+- Paginacion.url(n): URL directa de la página n, para pedirla con un cliente
+  HTTP (context.request) en vez de hacer click y esperar.
+- firma_pagina / esperar_reviews_nuevas: reconocen una página repetida (el
+  servidor ignoró el número de página o el click todavía no pintó la siguiente).
+"""
+import html
+import json
+import re
+from urllib.parse import urljoin, urlsplit, parse_qsl, urlencode, urlunsplit
+
+CLASE_CONTENEDOR = 'o-container-opiniones-small'
+CLASE_FECHA = 'a-opiniones-date'
+CLASE_UBICACION = 'opi-location'
+
+# Parámetros que suelen llevar el número de página o el desplazamiento
+PARAMETROS_PAGINA = ('page', 'pagina', 'pag', 'p', 'numpage', 'pageNumber')
+PARAMETROS_OFFSET = ('offset', 'start', 'from', 'desde', 'skip')
+
+# Recorre todas las opiniones dentro del navegador y devuelve solo los textos
+SCRIPT_REVIEWS = """([contenedor, fecha, ubicacion]) =>
+    Array.from(document.querySelectorAll(contenedor), (el) => {
+        const f = el.querySelector(fecha);
+        const u = el.querySelector(ubicacion);
+        return {date_text: f ? f.innerText : "", location_text: u ? u.innerText : null};
+    })"""
+
+PATRON_CONTENEDOR = re.compile(r'<(\w+)[^>]*class="[^"]*\b' + CLASE_CONTENEDOR + r'\b[^"]*"[^>]*>')
+PATRON_TAG_BLOQUE = re.compile(r'<br\s*/?>|</?(?:div|p|li|h\d)\b[^>]*>', re.IGNORECASE)
+PATRON_TAG = re.compile(r'<[^>]+>')
+
+
+def _patron_clase(clase):
+    return re.compile(r'<(\w+)[^>]*class="[^"]*\b' + re.escape(clase) + r'\b[^"]*"[^>]*>')
+
+
+PATRON_FECHA = _patron_clase(CLASE_FECHA)
+PATRON_UBICACION = _patron_clase(CLASE_UBICACION)
+
+
+def _cierre_balanceado(texto, tag, desde):
+    """Posición donde cierra el elemento <tag> abierto justo antes de `desde` (respeta anidados)."""
+    nivel = 1
+    for m in re.finditer(r'<(/?)' + tag + r'\b[^>]*>', texto[desde:], re.IGNORECASE):
+        nivel += -1 if m.group(1) else 1
+        if nivel == 0:
+            return desde + m.start()
+    return len(texto)
+
+
+def _texto_plano(fragmento):
+    """Equivalente aproximado a inner_text: saltos de línea en bloques, sin tags ni entidades."""
+    # Los saltos del código fuente son espacios; solo los bloques cortan línea
+    texto = PATRON_TAG_BLOQUE.sub('\x00', fragmento)
+    texto = html.unescape(PATRON_TAG.sub(' ', texto))
+    lineas = (" ".join(linea.split()) for linea in texto.split('\x00'))
+    return "\n".join(linea for linea in lineas if linea)
+
+
+def _texto_de_clase(bloque, patron):
+    m = patron.search(bloque)
+    if not m:
+        return None
+    fin = _cierre_balanceado(bloque, m.group(1), m.end())
+    return _texto_plano(bloque[m.end():fin])
+
+
+def parsear_reviews_html(texto_html):
+    """Lista de {'date_text', 'location_text'} (None si falta) en el orden de la página."""
+    reviews = []
+    for m in PATRON_CONTENEDOR.finditer(texto_html):
+        fin = _cierre_balanceado(texto_html, m.group(1), m.end())
+        bloque = texto_html[m.end():fin]
+        reviews.append({
+            'date_text': _texto_de_clase(bloque, PATRON_FECHA) or "",
+            'location_text': _texto_de_clase(bloque, PATRON_UBICACION),
+        })
+    return reviews
+
+
+async def leer_reviews_pagina(page, contenedor='.' + CLASE_CONTENEDOR,
+                              fecha='.' + CLASE_FECHA, ubicacion='.' + CLASE_UBICACION):
+    """Lista de {'date_text', 'location_text'} de la página actual con un único page.evaluate."""
+    return await page.evaluate(SCRIPT_REVIEWS, [contenedor, fecha, ubicacion])
+
+
+def firma_pagina(reviews):
+    """Identidad de una página de opiniones: sus (fecha, ubicación) en orden."""
+    return tuple((r['date_text'], r['location_text']) for r in reviews)
+
+
+async def esperar_reviews_nuevas(page, firma_anterior, contenedor='.' + CLASE_CONTENEDOR,
+                                 fecha='.' + CLASE_FECHA, ubicacion='.' + CLASE_UBICACION,
+                                 timeout_ms=10000, intervalo_ms=250):
+    """
+    Tras un click en "siguiente": espera a que la lista de opiniones sea otra.
+    Devuelve las opiniones nuevas, o [] si en timeout_ms sigue la misma página.
+    """
+    for _ in range(max(1, timeout_ms // intervalo_ms)):
+        reviews = await leer_reviews_pagina(page, contenedor, fecha, ubicacion)
+        if reviews and firma_pagina(reviews) != firma_anterior:
+            return reviews
+        await page.wait_for_timeout(intervalo_ms)
+    return []
+
+
+def _fragmentos_html(dato):
+    """Strings con marcado de opiniones dentro de una respuesta JSON (cualquier nivel)."""
+    if isinstance(dato, str):
+        if CLASE_CONTENEDOR in dato:
+            yield dato
+    elif isinstance(dato, dict):
+        for valor in dato.values():
+            yield from _fragmentos_html(valor)
+    elif isinstance(dato, list):
+        for valor in dato:
+            yield from _fragmentos_html(valor)
+
+
+def parsear_respuesta(cuerpo, content_type=""):
+    """Opiniones de una respuesta HTTP (HTML completo, fragmento o JSON que trae HTML)."""
+    if 'json' in content_type or cuerpo.lstrip()[:1] in ('{', '['):
+        try:
+            dato = json.loads(cuerpo)
+        except ValueError:
+            return parsear_reviews_html(cuerpo)
+        return [r for fragmento in _fragmentos_html(dato) for r in parsear_reviews_html(fragmento)]
+    return parsear_reviews_html(cuerpo)
+
+
+class Paginacion:
+    """URL de la página n a partir de la URL observada para la página 2."""
+
+    MARCA = '__PAGINA__'
+
+    def __init__(self, plantilla, paso=1, es_xhr=False):
+        self.plantilla = plantilla
+        self.paso = paso
+        self.es_xhr = es_xhr
+
+    def url(self, pagina):
+        valor = (pagina - 1) * self.paso if self.paso > 1 else pagina
+        return self.plantilla.replace(self.MARCA, str(valor))
+
+    @classmethod
+    def desde_url(cls, url, pagina_observada=2, es_xhr=False):
+        """Detecta dónde está el número de página en la URL. None si no lo encuentra."""
+        partes = urlsplit(url)
+        params = parse_qsl(partes.query, keep_blank_values=True)
+
+        for i, (clave, valor) in enumerate(params):
+            if not valor.isdigit():
+                continue
+            if clave.lower() in {p.lower() for p in PARAMETROS_PAGINA} and int(valor) == pagina_observada:
+                paso = 1
+            elif clave.lower() in PARAMETROS_OFFSET and int(valor) > 0:
+                # offset=10 en la página 2 -> 10 opiniones por página
+                paso = int(valor) // (pagina_observada - 1)
+                if paso < 2:
+                    continue
+            else:
+                continue
+            nuevos = params[:i] + [(clave, cls.MARCA)] + params[i + 1:]
+            return cls(urlunsplit(partes._replace(query=urlencode(nuevos, safe=cls.MARCA))), paso, es_xhr)
+
+        # Número de página como segmento del path: .../opiniones/2/
+        segmentos = partes.path.split('/')
+        for i in range(len(segmentos) - 1, -1, -1):
+            if segmentos[i] == str(pagina_observada):
+                segmentos[i] = cls.MARCA
+                return cls(urlunsplit(partes._replace(path='/'.join(segmentos))), 1, es_xhr)
+        return None
+
+
+async def descubrir_paginacion(page, selector_siguiente, timeout_ms=10000):
+    """
+    Devuelve (Paginacion o None, hizo_click).
+
+    Primero mira el href del botón "siguiente". Si es un enlace JavaScript, hace
+    un único click y captura la petición XHR/fetch que dispara. `hizo_click` indica
+    que el navegador ya quedó en la página 2.
+    """
+    href = await page.evaluate(
+        "(sel) => { const a = document.querySelector(sel); return a ? (a.getAttribute('href') || '') : null; }",
+        selector_siguiente
+    )
+    if href is None:
+        return None, False  # No hay página siguiente
+
+    if href and not href.startswith(('#', 'javascript')):
+        paginacion = Paginacion.desde_url(urljoin(page.url, href))
+        if paginacion:
+            return paginacion, False
+
+    # Solo peticiones al mismo sitio (no analítica ni terceros)
+    host = urlsplit(page.url).netloc
+    try:
+        async with page.expect_request(
+            lambda r: r.resource_type in ('xhr', 'fetch') and r.method == 'GET' and urlsplit(r.url).netloc == host,
+            timeout=timeout_ms
+        ) as info:
+            await page.evaluate("(sel) => document.querySelector(sel).click()", selector_siguiente)
+        peticion = await info.value
+    except Exception:
+        return None, True
+    return Paginacion.desde_url(peticion.url, es_xhr=True), True
+
+
+async def pedir_pagina(request_context, paginacion, pagina, timeout_ms=30000):
+    """Pide la página n con el cliente HTTP del contexto (mismas cookies). None si falla."""
+    headers = {'X-Requested-With': 'XMLHttpRequest'} if paginacion.es_xhr else None
+    try:
+        respuesta = await request_context.get(paginacion.url(pagina), headers=headers, timeout=timeout_ms)
+        if not respuesta.ok:
+            return None
+        return parsear_respuesta(await respuesta.text(), respuesta.headers.get('content-type', ''))
+    except Exception:
+        return None
@@ -0,0 +1,79 @@
+"""
+Lectura de fechas y país del usuario de las opiniones (Civitatis y GYG).
+
+Las fechas de opiniones son pocas y se repiten muchísimo (un día dado aparece
+en miles de opiniones), así que los textos sueltos pasan por una caché LRU y
+las columnas se resuelven una vez por valor distinto. Todo devuelve fechas
+tipadas (date / datetime64), no textos reformateados.
+"""
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+TAMANO_CACHE = 1 << 14
+
+MESES_ES = {
+    "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
+    "jul": 7, "ago": 8, "sep": 9, "oct": 10, "nov": 11, "dic": 12
+}
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def parsear_fecha_civitatis(texto_fecha):
+    """'12/mar/2025' -> date(2025, 3, 12). None si no tiene ese formato."""
+    try:
+        partes = texto_fecha.strip().split('/')
+        if len(partes) != 3: return None
+        dia = int(partes[0].strip())
+        mes_txt = partes[1].strip().lower()[:3]
+        anio = int(partes[2].strip())
+        numero_mes = MESES_ES.get(mes_txt, 1)
+        return date(anio, numero_mes, dia)
+    except (AttributeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def fecha_iso(texto_fecha):
+    """'2025-03-12T10:20:00Z' o '2025-03-12' -> date(2025, 3, 12). None si no es ISO."""
+    try:
+        return date.fromisoformat(texto_fecha[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def pais_desde_ubicacion(texto_ubicacion):
+    """'Ana - Lima, Perú' -> 'Perú' (lo que va después de la última coma o guion)."""
+    return texto_ubicacion.replace("-", ",").replace("\n", " ").split(",")[-1].strip()
+
+
+def _parsear_fecha_cualquiera(texto):
+    # ISO (Civitatis ya procesado), 'dd/mm/aaaa' (GYG) o 'dd/mes/aaaa' (Civitatis crudo)
+    fecha = fecha_iso(texto)
+    if fecha:
+        return fecha
+    partes = [p.strip() for p in texto.split('/')]
+    if len(partes) == 3 and partes[1].isdigit():
+        try:
+            return date(int(partes[2]), int(partes[1]), int(partes[0]))
+        except ValueError:
+            return None
+    return parsear_fecha_civitatis(texto)
+
+
+def parsear_fechas(serie):
+    """
+    Columna de fechas en cualquiera de los formatos de las opiniones -> datetime64 (NaT si no se entiende).
+    Cada texto distinto se interpreta una sola vez.
+    """
+    codigos, unicos = pd.factorize(serie)
+    # Resolución en segundos: admite años fuera del rango de datetime64[ns] (1677-2262) sin desbordar
+    fechas = np.array([_parsear_fecha_cualquiera(str(u)) or 'NaT' for u in unicos], dtype='datetime64[s]')
+    resultado = np.full(len(serie), np.datetime64('NaT'), dtype='datetime64[s]')
+    validos = codigos >= 0
+    resultado[validos] = fechas[codigos[validos]]
+    return pd.Series(resultado, index=serie.index)
+
@@ -1,6 +1,5 @@
-import re
 import pandas as pd
-import os
+from indice_sitemap import conectar, actualizar_indice, tours_por_ciudades
 
 # 1. Los archivos TXT que descargaste manualmente
 archivos_sitemap = [
@@ -501,52 +500,65 @@ ciudades_republica_dominicana = [
     "las-terrenas-l32306", "las-galeras-l129528", "el-limon-l177935"
 ]
 
-actividades_encontradas = []
+# 3. Países a exportar: (nombre para el CSV, lista de ciudades, archivo de salida)
+#    Los nombres de archivo son los que espera gyg/pricing.py
+paises = [
+    ("Argentina", ciudades_argentina, "gyg/tours_argentina_IDs.csv"),
+    ("Bolivia", ciudades_bolivia, "gyg/tours_bolivia_IDs.csv"),
+    ("Brasil", ciudades_brasil, "gyg/tours_brasil_IDs.csv"),
+    ("Chile", ciudades_chile, "gyg/tours_chile_IDs.csv"),
+    ("Colombia", ciudades_colombia, "gyg/tours_colombia_IDs.csv"),
+    ("Costa Rica", ciudades_costa_rica, "gyg/tours_costarica_IDs.csv"),
+    ("Ecuador", ciudades_ecuador, "gyg/tours_ecuador_IDs.csv"),
+    ("México", ciudades_mexico, "gyg/tours_mexico_IDs.csv"),
+    ("Panamá", ciudades_panama, "gyg/tours_panama_IDs.csv"),
+    ("Paraguay", ciudades_paraguay, "gyg/tours_paraguay_IDs.csv"),
+    ("Perú", ciudades_peru, "gyg/tours_peru_IDs.csv"),
+    ("República Dominicana", ciudades_republica_dominicana, "gyg/tours_republica_dominicana_IDs.csv"),
+    ("Uruguay", ciudades_uruguay, "gyg/tours_uruguay_IDs.csv"),
+]
+
+def buscar_tours(conn):
+    """Consulta el índice de sitemaps (gyg/indice_sitemap.db) país por país."""
+    encontrados = {}
+    for pais, ciudades, _ in paises:
+        encontrados[pais] = [
+            {
+                "pais": pais,
+                "ciudad_id": ciudad_slug,
+                "tour_id": str(tour_id),
+                # Limpiar un poco el título referencial
+                "titulo_referencia": titulo_slug.replace('-', ' ').capitalize() or "Desconocido",
+                "url": url
+            }
+            for tour_id, ciudad_slug, titulo_slug, url in tours_por_ciudades(conn, ciudades)
+        ]
+    return encontrados
+
+
+def exportar(encontrados):
+    """Escribe un tours_<pais>_IDs.csv por país."""
+    for pais, _, archivo_salida in paises:
+        actividades = encontrados[pais]
+        if not actividades:
+            print(f"\n⚠️ {pais}: no se encontraron tours. Revisa la lista de ciudades.")
+            continue
+
+        df = pd.DataFrame(actividades)
+        # Eliminar posibles duplicados
+        df = df.drop_duplicates(subset=['tour_id'])
+        df.to_csv(archivo_salida, index=False, sep=';', encoding='utf-8-sig')
 
-print("Iniciando búsqueda de tours en Brasil...")
+        print(f"✅ {pais}: {len(df)} tours guardados en '{archivo_salida}'")
 
-# 3. Procesar cada archivo de texto
-for archivo in archivos_sitemap:
-    if os.path.exists(archivo):
-        print(f"-> Analizando {archivo}...")
-        with open(archivo, 'r', encoding='utf-8') as f:
-            # Leer línea por línea
-            for url in f:
-                url = url.strip() # Quitar espacios o saltos de línea
-                
-                # Revisar si alguna ciudad de Brasil está en esta URL
-                for ciudad_slug in ciudades_republica_dominicana:
-                    if f"/{ciudad_slug}/" in url:
-                        # Extraer el ID (todo lo que está entre '-t' y '/')
-                        match_id = re.search(r'-t(\d+)/', url)
-                        tour_id = match_id.group(1) if match_id else "N/A"
-                        
-                        # Limpiar un poco el título referencial
-                        try:
-                            titulo_bruto = url.split(f"/{ciudad_slug}/")[1].split('-t')[0].replace('-', ' ').capitalize()
-                        except IndexError:
-                            titulo_bruto = "Desconocido"
-                        
-                        actividades_encontradas.append({
-                            "pais": "República Dominicana",
-                            "ciudad_id": ciudad_slug,
-                            "tour_id": tour_id,
-                            "titulo_referencia": titulo_bruto,
-                            "url": url
-                        })
-    else:
-        print(f"⚠️ Archivo no encontrado: {archivo}. Saltando...")
 
-# 4. Exportar los resultados
-if actividades_encontradas:
-    df = pd.DataFrame(actividades_encontradas)
-    # Eliminar posibles duplicados
-    df = df.drop_duplicates(subset=['tour_id'])
-    
-    archivo_salida = 'gyg/tours_republica_dominicana_IDs.csv'
-    df.to_csv(archivo_salida, index=False, sep=';', encoding='utf-8-sig')
-    
-    print(f"\n✅ ¡ÉXITO ROTUNDO! Se encontraron {len(df)} tours y se guardaron en '{archivo_salida}'")
-    print(df.head())
-else:
-    print("\nNo se encontraron tours. Revisa la lista de ciudades o asegúrate de haber descargado los archivos TXT correctos.")
\ No newline at end of file
+if __name__ == "__main__":
+    print(f"Iniciando búsqueda de tours para {len(paises)} países...")
+    conn = conectar()
+    try:
+        # Solo relee los TXT si llegó un volcado nuevo de sitemaps
+        actualizar_indice(conn, archivos_sitemap)
+        encontrados = buscar_tours(conn)
+    finally:
+        conn.close()
+    exportar(encontrados)
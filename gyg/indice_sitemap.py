@@ -0,0 +1,149 @@
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+# --- CONFIGURACIÓN ---
+ARCHIVO_INDICE = 'gyg/indice_sitemap.db'
+ARCHIVOS_SITEMAP = [f"gyg/sitemap-activity-{i}.txt" for i in range(7)]
+
+# Todas las URLs tienen la forma .../es-es/<ciudad>-l<ID>/<titulo>-t<ID>/
+# Un solo regex nos da el segmento de ciudad, el título y el ID del tour
+PATRON_URL = re.compile(r'^https?://[^/]+/[^/]+/([^/]+)/([^/]*?)-t(\d+)/?$')
+PATRON_LOCATION_ID = re.compile(r'-l(\d+)$')
+
+
+def parsear_url(url):
+    """Devuelve (tour_id, location_slug, location_id, titulo_slug, url) o None."""
+    match = PATRON_URL.match(url)
+    if not match:
+        return None
+    location_slug, titulo_slug, tour_id = match.groups()
+    match_loc = PATRON_LOCATION_ID.search(location_slug)
+    location_id = int(match_loc.group(1)) if match_loc else None
+    return int(tour_id), location_slug, location_id, titulo_slug, url
+
+
+def conectar(ruta=ARCHIVO_INDICE):
+    conn = sqlite3.connect(ruta)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS tours (
+            tour_id INTEGER PRIMARY KEY,
+            location_slug TEXT NOT NULL,
+            location_id INTEGER,
+            titulo_slug TEXT NOT NULL,
+            url TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tours_location ON tours (location_slug);
+
+        CREATE TABLE IF NOT EXISTS sitemaps (
+            archivo TEXT PRIMARY KEY,
+            tamaño INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            fecha_carga TEXT NOT NULL
+        );
+    """)
+    return conn
+
+
+def _firma(archivo):
+    info = os.stat(archivo)
+    return info.st_size, info.st_mtime
+
+
+def _leer_urls(archivos):
+    for archivo in archivos:
+        print(f"-> Indexando {archivo}...")
+        with open(archivo, 'r', encoding='utf-8') as f:
+            for linea in f:
+                fila = parsear_url(linea.strip())
+                if fila:
+                    yield fila
+
+
+def actualizar_indice(conn, archivos=ARCHIVOS_SITEMAP):
+    """
+    Sincroniza el índice con el volcado actual de sitemaps.
+    Si ningún archivo cambió (tamaño + fecha) no relee nada.
+    Devuelve (agregados, eliminados) como listas de tour_id.
+    """
+    presentes = [a for a in archivos if os.path.exists(a)]
+    for archivo in archivos:
+        if archivo not in presentes:
+            print(f"⚠️ Archivo no encontrado: {archivo}. Saltando...")
+    if not presentes:
+        return [], []
+
+    firmas_guardadas = {a: (t, m) for a, t, m in conn.execute("SELECT archivo, tamaño, mtime FROM sitemaps")}
+    if all(firmas_guardadas.get(a) == _firma(a) for a in presentes) and len(firmas_guardadas) == len(presentes):
+        print("✅ Índice al día: los sitemaps no cambiaron.")
+        return [], []
+
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp.volcado")
+        conn.execute("""
+            CREATE TEMP TABLE volcado (
+                tour_id INTEGER PRIMARY KEY,
+                location_slug TEXT NOT NULL,
+                location_id INTEGER,
+                titulo_slug TEXT NOT NULL,
+                url TEXT NOT NULL
+            )
+        """)
+        conn.executemany("INSERT OR REPLACE INTO temp.volcado VALUES (?, ?, ?, ?, ?)", _leer_urls(presentes))
+
+        agregados = [r[0] for r in conn.execute(
+            "SELECT tour_id FROM temp.volcado WHERE tour_id NOT IN (SELECT tour_id FROM tours)"
+        )]
+
+        # Solo damos de baja tours si tenemos el volcado completo; con archivos
+        # faltantes no podemos distinguir "eliminado" de "no descargado"
+        eliminados = []
+        if len(presentes) == len(archivos):
+            eliminados = [r[0] for r in conn.execute(
+                "SELECT tour_id FROM tours WHERE tour_id NOT IN (SELECT tour_id FROM temp.volcado)"
+            )]
+            conn.execute("DELETE FROM tours WHERE tour_id NOT IN (SELECT tour_id FROM temp.volcado)")
+
+        # INSERT OR REPLACE también actualiza tours que cambiaron de ciudad o título
+        conn.execute("INSERT OR REPLACE INTO tours SELECT * FROM temp.volcado")
+        conn.execute("DROP TABLE temp.volcado")
+
+        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.execute("DELETE FROM sitemaps")
+        conn.executemany(
+            "INSERT INTO sitemaps VALUES (?, ?, ?, ?)",
+            [(a, *_firma(a), ahora) for a in presentes]
+        )
+
+    total = conn.execute("SELECT COUNT(*) FROM tours").fetchone()[0]
+    print(f"✅ Índice actualizado: {total} tours | +{len(agregados)} nuevos | -{len(eliminados)} eliminados")
+    return agregados, eliminados
+
+
+def tours_por_ciudades(conn, ciudades_slugs):
+    """Consulta indexada: todos los tours cuyas ciudades están en la lista."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS ciudades_buscadas (location_slug TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.ciudades_buscadas")
+    conn.executemany(
+        "INSERT OR IGNORE INTO temp.ciudades_buscadas VALUES (?)",
+        [(slug,) for slug in ciudades_slugs]
+    )
+    return conn.execute("""
+        SELECT t.tour_id, t.location_slug, t.titulo_slug, t.url
+        FROM temp.ciudades_buscadas c
+        JOIN tours t ON t.location_slug = c.location_slug
+        ORDER BY t.tour_id
+    """).fetchall()
+
+
+if __name__ == "__main__":
+    conn = conectar()
+    try:
+        agregados, eliminados = actualizar_indice(conn)
+        if agregados:
+            print(f"   ↳ Ejemplos nuevos: {agregados[:10]}")
+        if eliminados:
+            print(f"   ↳ Ejemplos eliminados: {eliminados[:10]}")
+    finally:
+        conn.close()
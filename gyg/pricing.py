@@ -1,5 +1,7 @@
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import random
 import os
@@ -31,6 +33,18 @@ cookies_usd = {'currency': 'USD'}
 
 lock_csv = threading.Lock()
 
+# Sesión HTTP por hilo: reutiliza conexiones (keep-alive) entre tours
+sesiones_por_hilo = threading.local()
+
+# Reintentos con espera exponencial (1s, 2s, 4s) ante errores 5xx y timeouts
+max_reintentos = 3
+estados_reintento = (500, 502, 503, 504)
+
+# Descarga parcial: dejamos de leer cuando ya llegó todo lo que usamos
+marcador_fin_head = b'</head>'
+marcador_reseñas = b'simple-activity-rating--reviews-count'
+tamaño_bloque = 16 * 1024
+
 # --- 3. PREPARAR ARCHIVO DE SALIDA Y MEMORIA ---
 if not os.path.exists(archivo_salida):
     with open(archivo_salida, 'w', encoding='utf-8-sig') as f:
@@ -85,6 +99,54 @@ def extraer_metadata(html, url, tour_id, pais, destino):
             f.write(linea)
 
 
+def obtener_sesion():
+    """Devuelve la sesión del hilo actual, creándola la primera vez."""
+    sesion = getattr(sesiones_por_hilo, 'sesion', None)
+    if sesion is None:
+        reintentos = Retry(
+            total=max_reintentos,
+            connect=max_reintentos,
+            read=max_reintentos,
+            status=max_reintentos,
+            backoff_factor=1,
+            status_forcelist=estados_reintento,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adaptador = HTTPAdapter(max_retries=reintentos, pool_connections=1, pool_maxsize=1)
+        sesion = requests.Session()
+        sesion.mount('https://', adaptador)
+        sesion.mount('http://', adaptador)
+        sesion.headers.update(headers)
+        sesion.cookies.update(cookies_usd)
+        sesiones_por_hilo.sesion = sesion
+    return sesion
+
+
+def descargar_cabecera(respuesta):
+    """
+    Lee el HTML en bloques y corta la descarga en cuanto tenemos el <head>
+    (metadatos og:/product:) y el bloque de reseñas ya cerrado.
+    """
+    contenido = bytearray()
+    try:
+        for bloque in respuesta.iter_content(chunk_size=tamaño_bloque):
+            if not bloque:
+                continue
+            contenido.extend(bloque)
+            if contenido.find(marcador_fin_head) == -1:
+                continue
+            pos_reseñas = contenido.find(marcador_reseñas)
+            if pos_reseñas != -1 and contenido.find(b'</', pos_reseñas) != -1:
+                break
+    finally:
+        # Cerrar sin consumir el resto corta la descarga (esa conexión se descarta del pool)
+        respuesta.close()
+
+    codificacion = respuesta.encoding or 'utf-8'
+    return bytes(contenido).decode(codificacion, errors='replace')
+
+
 def procesar_tour(row, pais):
     tour_id = str(row['tour_id'])
     url = str(row['url'])
@@ -96,23 +158,23 @@ def procesar_tour(row, pais):
         return None
 
     try:
-        # AÑADIDO: params={'currency': 'USD'} y cookies para doble confirmación del dólar
-        respuesta = requests.get(
+        # AÑADIDO: params={'currency': 'USD'} y cookies (en la sesión) para doble confirmación del dólar
+        respuesta = obtener_sesion().get(
             url, 
-            headers=headers, 
-            cookies=cookies_usd, 
             params={'currency': 'USD'}, 
-            timeout=15
+            timeout=15,
+            stream=True
         )
         
         if respuesta.status_code == 200:
-            extraer_metadata(respuesta.text, url, tour_id, pais, destino)
+            extraer_metadata(descargar_cabecera(respuesta), url, tour_id, pais, destino)
             
             # TURBO ACTIVADO: Tiempo de espera drásticamente reducido
             time.sleep(random.uniform(0.2, 0.7)) 
             return f"✅ {pais} - {tour_id}: Completado"
             
-        elif respuesta.status_code == 404:
+        respuesta.close()
+        if respuesta.status_code == 404:
             return f"🚫 {pais} - {tour_id}: Inactivo/404"
         else:
             return f"⚠️ {pais} - {tour_id}: Error {respuesta.status_code}"
@@ -4,14 +4,19 @@ import time
 import random
 import os
 import json
-from datetime import datetime, timedelta
+import sys
+from datetime import date, timedelta
+
+# fechas_reviews.py vive en la raíz del repo (compartido con los scrapers de Civitatis)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fechas_reviews import fecha_iso
 
 # --- CONFIGURACIÓN ---
 archivo_entrada = 'gyg/tours_mexico_IDs.csv'
 archivo_salida = 'gyg/reviews_mexico_FINAL.csv'
 
 url_api_post = "https://travelers-api.getyourguide.com/user-interface/activity-details-page/blocks?ranking_uuid=8db3d7f9-ae97-4e8e-9782-086c43dd5f1b"
-hace_5_anos = datetime.now() - timedelta(days=5*365)
+hace_5_anos = date.today() - timedelta(days=5*365)
 
 # TUS CABECERAS EXACTAS
 headers = {
@@ -178,9 +183,9 @@ for index, row in df_tours.iterrows():
                     
                     if not fecha_str: continue
                         
-                    try:
-                        fecha_obj = datetime.strptime(fecha_str.split('T')[0], "%Y-%m-%d")
-                    except ValueError: continue 
+                    # Memoizada: la misma fecha se repite en muchas reseñas
+                    fecha_obj = fecha_iso(fecha_str[:10])
+                    if fecha_obj is None: continue
                     
                     if fecha_obj < hace_5_anos:
                         print(f"  ⏳ {reseñas_guardadas} guardadas (Límite 5 años).")
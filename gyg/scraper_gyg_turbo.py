@@ -6,14 +6,19 @@ import os
 import json
 import concurrent.futures
 import threading
-from datetime import datetime, timedelta
+import sys
+from datetime import date, timedelta
+
+# fechas_reviews.py vive en la raíz del repo (compartido con los scrapers de Civitatis)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fechas_reviews import fecha_iso
 
 # --- CONFIGURACIÓN ---
 archivo_entrada = 'gyg/tours_republica_dominicana_IDs.csv'
 archivo_salida = 'gyg/reviews_republica_dominicana_FINAL.csv'
 
 url_api_post = "https://travelers-api.getyourguide.com/user-interface/activity-details-page/blocks?ranking_uuid=8db3d7f9-ae97-4e8e-9782-086c43dd5f1b"
-hace_5_anos = datetime.now() - timedelta(days=5*365)
+hace_5_anos = date.today() - timedelta(days=5*365)
 
 # TUS CABECERAS EXACTAS
 headers = {
@@ -133,9 +138,9 @@ def procesar_tour(row):
                 fecha_str = tracker.get('review_date', '')
                 if not fecha_str: continue
                     
-                try:
-                    fecha_obj = datetime.strptime(fecha_str.split('T')[0], "%Y-%m-%d")
-                except ValueError: continue 
+                # Memoizada: la misma fecha se repite en muchas reseñas
+                fecha_obj = fecha_iso(fecha_str[:10])
+                if fecha_obj is None: continue
                 
                 if fecha_obj < hace_5_anos:
                     continuar_paginando = False 
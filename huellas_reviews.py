@@ -0,0 +1,69 @@
+"""
+Identidad estable de cada opinión para no escribir filas repetidas.
+
+La huella es un hash de (url de la actividad, fecha, ubicación, ordinal), donde
+el ordinal numera las opiniones con la misma fecha y ubicación dentro de la
+actividad (en el orden de la página). Así, la misma opinión da la misma huella
+aunque la actividad aparezca en dos destinos o se reintente a mitad de camino,
+y dos opiniones reales iguales en fecha y ubicación siguen siendo distintas.
+
+Las huellas escritas se guardan en un set en memoria y en un .txt (una por
+línea) que se recarga en la siguiente corrida. Para seguir una actividad a
+mitad de camino, los contadores de ordinales se exportan y se restauran
+(ordinales_de / restaurar_ordinales).
+"""
+import hashlib
+import os
+from collections import Counter
+
+
+def huella_review(url, fecha, ubicacion, ordinal):
+    texto = f"{url}|{fecha}|{' '.join((ubicacion or '').split())}|{ordinal}"
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class HuellasReviews:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.huellas = set()
+        self.ordinales = {}
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                self.huellas = set(line.strip() for line in f if line.strip())
+
+    def __len__(self):
+        return len(self.huellas)
+
+    def iniciar_actividad(self, url):
+        """Arranca (o reinicia, si es un reintento) la numeración de una actividad."""
+        self.ordinales[url] = Counter()
+
+    def terminar_actividad(self, url):
+        self.ordinales.pop(url, None)
+
+    def ordinales_de(self, url):
+        """Contadores de la actividad como lista [[fecha, ubicación, n], ...] (apta para JSON)."""
+        return [[fecha, ubicacion, n] for (fecha, ubicacion), n in self.ordinales.get(url, {}).items()]
+
+    def restaurar_ordinales(self, url, lista):
+        """Retoma la numeración de una actividad donde quedó (lista de ordinales_de)."""
+        self.ordinales[url] = Counter({(fecha, ubicacion): n for fecha, ubicacion, n in lista})
+
+    def huella(self, url, fecha, ubicacion):
+        """Huella de la siguiente opinión de la actividad; se llama para cada opinión, en orden."""
+        contador = self.ordinales.setdefault(url, Counter())
+        clave = (fecha, ubicacion)
+        ordinal = contador[clave]
+        contador[clave] += 1
+        return huella_review(url, fecha, ubicacion, ordinal)
+
+    def es_nueva(self, huella):
+        return huella not in self.huellas
+
+    def confirmar(self, huellas):
+        """Marca como escritas las huellas de un lote ya guardado en el CSV."""
+        if not huellas:
+            return
+        self.huellas.update(huellas)
+        with open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write("".join(h + '\n' for h in huellas))
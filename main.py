@@ -1,17 +1,11 @@
 import asyncio
 import os
-import json
 import sys
 from datetime import datetime
 from drivers.civitatis import CivitatisScraper
 from drivers.civitatis_semanal import CivitatisScraperSemanal
 from drivers.nomades import NomadesScraper
-
-# --- (Civitatis) ---
-def cargar_destinos_civitatis(paises):
-    with open('destinos_civitatis.json', 'r', encoding='utf-8') as f:
-        todos = json.load(f)
-    return [d for d in todos if d['nameCountry'].lower() in [p.lower() for p in paises]]
+from catalogo_destinos import cargar_destinos_civitatis
 
 # --- (Nomades) ---
 def parsear_destinos_nomades(ruta):
@@ -1,21 +1,9 @@
 import asyncio
 import os
-import json
 import sys
 from datetime import datetime
 from drivers.civitatis_cutoff import CivitatisCutoffScraper
-
-def cargar_destinos_civitatis(paises):
-    """Carga y filtra destinos basados en el JSON local."""
-    if not os.path.exists('destinos_civitatis.json'):
-        print("❌ Error: No se encontró destinos_civitatis.json")
-        return []
-
-    with open('destinos_civitatis.json', 'r', encoding='utf-8') as f:
-        todos = json.load(f)
-
-    paises_lower = [p.lower() for p in paises]
-    return [d for d in todos if d.get('nameCountry', '').lower() in paises_lower]
+from catalogo_destinos import cargar_destinos_civitatis
 
 async def ejecutar_civitatis_cutoff(pais_objetivo):
     """Ejecuta el scraper de cutoff para un país específico."""
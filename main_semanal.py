@@ -1,25 +1,11 @@
 import asyncio
 import os
-import json
 import sys
 from datetime import datetime
 from drivers.civitatis_semanal import CivitatisScraperSemanal
+from catalogo_destinos import cargar_destinos_civitatis
 
 # --- Funciones Auxiliares ---
-def cargar_destinos_civitatis(paises):
-    # Asegúrate de que este archivo existe en tu repo
-    ruta_json = 'destinos_civitatis.json'
-    if not os.path.exists(ruta_json):
-        print(f"❌ Error: No se encontró {ruta_json}")
-        return []
-        
-    with open(ruta_json, 'r', encoding='utf-8') as f:
-        todos = json.load(f)
-    
-    # Filtramos normalizando a minúsculas para evitar errores de mayúsculas/tildes
-    paises_lower = [p.lower() for p in paises]
-    return [d for d in todos if d.get('nameCountry', '').lower() in paises_lower]
-
 async def ejecutar_civitatis_semanal(pais_objetivo, moneda_objetivo):
     # 1. Cargar destinos para el país específico
     destinos = cargar_destinos_civitatis([pais_objetivo])
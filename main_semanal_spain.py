@@ -1,30 +1,16 @@
 import asyncio
 import os
-import json
 import sys
 import math
 import shutil
 from datetime import datetime
 from drivers.civitatis_semanal import CivitatisScraperSemanal
+from catalogo_destinos import cargar_destinos_civitatis
 
 # --- Configuración ---
 MAX_CONCURRENTE = 3  # 3 navegadores paralelos evitan que GitHub Actions se quede sin memoria (OOM)
 
 # --- Funciones Auxiliares ---
-def cargar_destinos_civitatis(paises):
-    # Asegúrate de que este archivo existe en tu repo
-    ruta_json = 'destinos_civitatis.json'
-    if not os.path.exists(ruta_json):
-        print(f"❌ Error: No se encontró {ruta_json}")
-        return []
-        
-    with open(ruta_json, 'r', encoding='utf-8') as f:
-        todos = json.load(f)
-    
-    # Filtramos normalizando a minúsculas para evitar errores de mayúsculas/tildes
-    paises_lower = [p.lower() for p in paises]
-    return [d for d in todos if d.get('nameCountry', '').lower() in paises_lower]
-
 async def procesar_chunk(id_chunk, destinos_chunk, pais_objetivo, moneda_objetivo, timestamp):
     """Ejecuta una instancia aislada del scraper para un bloque de destinos."""
     if not destinos_chunk:
@@ -1,22 +1,13 @@
 import asyncio
 import os
-import json
 from drivers.civitatis_operadores import CivitatisScraper
+from catalogo_destinos import cargar_destinos_civitatis
 
 # --- Configuración de la Prueba ---
 PAIS_DE_PRUEBA = "Chile"  # <--- Cambia esto por el país que quieras
 MONEDA_DE_PRUEBA = "USD"
 # ----------------------------------
 
-def cargar_destinos_civitatis(paises):
-    if not os.path.exists('destinos_civitatis.json'):
-        print("❌ Error: No se encontró destinos_civitatis.json")
-        return []
-    with open('destinos_civitatis.json', 'r', encoding='utf-8') as f:
-        todos = json.load(f)
-    paises_lower = [p.lower() for p in paises]
-    return [d for d in todos if d.get('nameCountry', '').lower() in paises_lower]
-
 async def ejecutar_test():
     if not os.path.exists('data'): 
         os.makedirs('data')
@@ -0,0 +1,132 @@
+"""
+Marcas de agua por actividad para bajar solo las opiniones nuevas.
+
+Por cada URL de actividad se guarda la fecha de la opinión más reciente ya
+descargada y la huella (fecha + ubicación) de las opiniones de ese mismo día.
+En la siguiente pasada, como Civitatis lista las opiniones de la más nueva a
+la más vieja, se puede cortar la paginación al llegar a esa fecha:
+  - fecha posterior a la marca      -> opinión nueva
+  - mismo día y huella ya guardada  -> ya descargada (se salta)
+  - mismo día y huella desconocida  -> nueva del mismo día
+  - fecha anterior a la marca       -> fin, lo que sigue ya está descargado
+
+Las marcas son por destino (no por parte): si cambia cómo se reparte un destino
+entre jobs, cada parte sigue encontrando las marcas de sus actividades.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+from datetime import datetime
+
+from normalizacion import normalizar_texto
+
+NUEVA, VISTA, FIN = 'nueva', 'vista', 'fin'
+
+
+def nombre_destino(destino, parte=1, partes=1):
+    """Nombre de archivo de un destino ('Roma, Italia' -> 'roma_italia'), con la parte si está repartido."""
+    nombre = normalizar_texto(destino.split(':')[0]).replace(", ", "_").replace(" ", "_")
+    return f"{nombre}_parte{parte}de{partes}" if partes > 1 else nombre
+
+
+def huella_review(fecha, ubicacion):
+    """Huella corta y estable de una opinión a partir de lo que se extrae de ella."""
+    texto = f"{fecha}|{' '.join((ubicacion or '').split())}"
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+
+class SeguimientoActividad:
+    """Estado de una actividad durante una pasada: decide qué opiniones son nuevas y arma la marca nueva."""
+
+    def __init__(self, marca=None):
+        marca = marca or {}
+        self.fecha_marca = marca.get('fecha')
+        self.pendientes = Counter(marca.get('huellas', []))
+        self.fecha_max = None
+        self.huellas = []
+
+    def clasificar(self, fecha, ubicacion):
+        """fecha en formato YYYY-MM-DD (o None si no se pudo leer). Devuelve NUEVA, VISTA o FIN."""
+        if fecha is None:
+            return NUEVA
+        if self.fecha_marca and fecha < self.fecha_marca:
+            return FIN
+
+        huella = huella_review(fecha, ubicacion)
+        self._registrar(fecha, huella)
+        if fecha == self.fecha_marca and self.pendientes[huella] > 0:
+            self.pendientes[huella] -= 1
+            return VISTA
+        return NUEVA
+
+    def _registrar(self, fecha, huella):
+        if self.fecha_max is None or fecha > self.fecha_max:
+            self.fecha_max, self.huellas = fecha, [huella]
+        elif fecha == self.fecha_max:
+            # Sin tope: una huella que falte haría bajar de nuevo esa opinión en la próxima pasada
+            self.huellas.append(huella)
+
+    def marca(self):
+        """Marca a guardar tras una pasada completa (None si no se vio ninguna opinión con fecha)."""
+        if self.fecha_max is None:
+            return None
+        return {'fecha': self.fecha_max, 'huellas': self.huellas,
+                'actualizado': datetime.now().strftime("%Y-%m-%d")}
+
+
+class MarcasReviews:
+    """Marcas de todas las actividades de un destino, en un JSON (se reescribe de forma atómica)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.marcas = self._leer(avisar=True)
+        self.propias = {}
+
+    def _leer(self, avisar=False):
+        if not os.path.exists(self.ruta):
+            return {}
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            if avisar:
+                print(f"⚠️ No se pudieron leer las marcas de {self.ruta} ({e}). Se baja todo de nuevo.", flush=True)
+            return {}
+
+    def __len__(self):
+        return len(self.marcas)
+
+    def seguimiento(self, url, completo=False):
+        """Seguimiento para una pasada; con completo=True se ignora la marca y se baja todo."""
+        return SeguimientoActividad(None if completo else self.marcas.get(url))
+
+    def actualizar(self, url, seguimiento):
+        marca = seguimiento.marca()
+        if marca is None:
+            return
+        self.marcas[url] = marca
+        self.propias[url] = marca
+        # Otras partes del mismo destino escriben el mismo archivo: se relee y se pisan solo las propias
+        guardar_marcas(self.ruta, {**self._leer(), **self.propias})
+
+
+def guardar_marcas(ruta, marcas):
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(marcas, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def unir_marcas(rutas):
+    """
+    Junta copias de las marcas de un destino (caché anterior y una por shard). Por actividad
+    gana la más avanzada: fecha más nueva y, en el mismo día, la que tiene más huellas.
+    """
+    unidas = {}
+    for ruta in rutas:
+        for url, marca in MarcasReviews(ruta).marcas.items():
+            actual = unidas.get(url)
+            if actual is None or (marca['fecha'], len(marca['huellas'])) > (actual['fecha'], len(actual['huellas'])):
+                unidas[url] = marca
+    return unidas
@@ -0,0 +1,45 @@
+"""
+Normalización de texto compartida por los cruces y los scrapers.
+
+Una sola regla para todo el repo: sin acentos (NFKD -> ASCII), minúsculas y
+espacios colapsados. Los textos sueltos pasan por una caché LRU (los mismos
+destinos y operadores se repiten miles de veces) y las columnas de pandas se
+normalizan una vez por valor distinto.
+"""
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+TAMANO_CACHE = 1 << 16
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
+    return " ".join(texto.lower().split())
+
+
+def normalizar_texto(texto):
+    """Limpia acentos, mayúsculas y espacios para una comparación perfecta."""
+    if texto is None or (isinstance(texto, float) and texto != texto):  # None o NaN
+        return ""
+    return _normalizar(str(texto))
+
+
+def normalizar_serie(serie):
+    """
+    Misma regla que normalizar_texto para una columna entera.
+    Se normaliza cada valor distinto una sola vez (vía .str) y se expande con los códigos.
+    """
+    codigos, unicos = pd.factorize(serie)
+    if len(unicos) == 0:
+        return pd.Series('', index=serie.index, dtype=object)
+    limpios = (pd.Series(unicos).astype(str)
+               .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+               .str.lower().str.split().str.join(' '))
+    # Código -1 = NaN/None -> ""
+    valores = limpios.to_numpy(dtype=object)
+    resultado = pd.Series(valores[codigos], index=serie.index, dtype=object)
+    resultado[codigos < 0] = ""
+    return resultado
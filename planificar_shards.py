@@ -0,0 +1,292 @@
+"""
+Reparto de los destinos de opiniones en N shards parejos para el workflow.
+
+Etapas (una por job del workflow scrape_reviews_destinos.yml):
+    python planificar_shards.py planificar [--shards N] [--historial reviews_civitatis]
+        -> plan_shards.json y, en Actions, la matriz {"shard": [0..N-1]} en GITHUB_OUTPUT
+    python planificar_shards.py ejecutar --shard i [--marcas marcas_reviews]
+        -> corre reviews_destino.py para cada tarea del shard y deja resultados/estado_shard_i.json
+    python planificar_shards.py verificar [--dir artefactos]
+        -> revisa en los estados descargados (sueltos o en zips) que todas las tareas del plan terminaron bien
+    python planificar_shards.py marcas [--dir artefactos] [--cache marcas_reviews]
+        -> une las marcas de los shards con las de la caché y guarda el progreso de las pasadas sin terminar
+
+El costo de cada destino sale de lo que tardó en la corrida anterior (estados
+de shard que el workflow guarda en caché y pasa con --historial) o, si no hay,
+de una estimación con totalActivities y numReviews de destinos_civitatis.json. Los destinos que solos
+superan el objetivo por shard se parten en k partes (reviews_destino.py --parte j/k)
+y todo se reparte con LPT: de mayor a menor costo, cada tarea al shard más liviano.
+
+Las marcas de opiniones (una por destino) y el progreso de cada tarea viajan
+entre corridas en una caché aparte: cada shard copia a resultados/ las de sus
+tareas antes de correrlas, así solo se bajan las opiniones nuevas.
+"""
+import argparse
+import glob
+import heapq
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+from catalogo_destinos import buscar_destino
+from marcas_reviews import nombre_destino, unir_marcas, guardar_marcas
+
+ARCHIVO_DESTINOS = 'destinos_reviews.txt'
+ARCHIVO_PLAN = 'plan_shards.json'
+CARPETA_RESULTADOS = 'resultados'
+CARPETA_ZIPS = 'reviews_civitatis'
+CARPETA_ARTEFACTOS = 'artefactos'
+CARPETA_MARCAS = 'marcas_reviews'
+
+# Estimación sin historial, en segundos de reloj por destino. Ajustada (mínimos
+# cuadrados) a la duración de los 85 jobs de un destino de la corrida del
+# 18/03/2026 en reviews_civitatis/resultados-*.zip: fin = última escritura del
+# zip, inicio = cuando se liberó uno de los 15 lugares de max-parallel.
+# Roma (139 actividades, 269k opiniones): 12.5 min medidos, 13 estimados.
+SEGUNDOS_POR_DESTINO = 71
+SEGUNDOS_POR_ACTIVIDAD = 2.4
+SEGUNDOS_POR_REVIEW = 0.0014
+# Horas de trabajo objetivo por shard (el job se corta a las 6). El margen cubre
+# los destinos que tardan más de lo estimado (hasta ~3x en los chicos)
+HORAS_OBJETIVO = 3.0
+HORAS_LIMITE = 5.5
+# Jobs simultáneos del workflow (max-parallel): por lo menos tantos shards, si hay destinos
+SHARDS_EN_PARALELO = 15
+
+
+def leer_destinos(ruta=ARCHIVO_DESTINOS):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return [linea.strip() for linea in f if linea.strip() and not linea.startswith('#')]
+
+
+def estimar_segundos(destino):
+    obj = buscar_destino(destino)
+    if not obj:
+        return None
+    actividades = int(obj.get('totalActivities') or 0)
+    reviews = int(obj.get('numReviews') or 0)
+    return SEGUNDOS_POR_DESTINO + actividades * SEGUNDOS_POR_ACTIVIDAD + reviews * SEGUNDOS_POR_REVIEW
+
+
+def leer_estados(carpeta):
+    """Estados de shard (estado_shard_*.json) sueltos en la carpeta o dentro de sus zips."""
+    estados = []
+    for ruta in sorted(glob.glob(os.path.join(carpeta, '**', 'estado_shard_*.json'), recursive=True)):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            estados.append(json.load(f))
+    for ruta in sorted(glob.glob(os.path.join(carpeta, '*.zip'))):
+        try:
+            with zipfile.ZipFile(ruta) as z:
+                for nombre in z.namelist():
+                    if os.path.basename(nombre).startswith('estado_shard_') and nombre.endswith('.json'):
+                        estados.append(json.loads(z.read(nombre)))
+        except zipfile.BadZipFile:
+            print(f"⚠️ {ruta} no es un zip válido. Saltando...")
+    return estados
+
+
+def segundos_medidos(carpeta):
+    """Segundos por destino en la corrida anterior (solo destinos con todas sus partes en 0)."""
+    partes = {}
+    for estado in leer_estados(carpeta):
+        for tarea in estado.get('tareas', []):
+            # Corridas distintas pueden haber partido el mismo destino de otra forma
+            partes.setdefault((tarea['destino'], tarea['partes']), {})[tarea['parte']] = tarea
+    medidos = {}
+    for (destino, total_partes), tareas in partes.items():
+        if len(tareas) == total_partes and all(t['codigo'] == 0 for t in tareas.values()):
+            medidos[destino] = sum(t['segundos'] for t in tareas.values())
+    return medidos
+
+
+def planificar(destinos, n_shards=None, historial=None, horas_objetivo=HORAS_OBJETIVO):
+    medidos = segundos_medidos(historial) if historial else {}
+    costos = {}
+    for destino in destinos:
+        segundos = medidos.get(destino) or estimar_segundos(destino)
+        if segundos is None:
+            print(f"⚠️ '{destino}' no está en destinos_civitatis.json. Saltando...")
+            continue
+        costos[destino] = max(segundos, 1.0)
+
+    total = sum(costos.values())
+    objetivo = horas_objetivo * 3600
+    if not n_shards:
+        n_shards = max(1, math.ceil(total / objetivo), min(SHARDS_EN_PARALELO, len(costos)))
+    # Ningún destino puede pesar más que un shard parejo: los grandes se parten
+    capacidad = min(objetivo, total / n_shards)
+
+    tareas = []
+    for destino, segundos in costos.items():
+        partes = max(1, math.ceil(segundos / capacidad))
+        for parte in range(1, partes + 1):
+            tareas.append({'destino': destino, 'parte': parte, 'partes': partes,
+                           'segundos_estimados': round(segundos / partes)})
+
+    # LPT: de la tarea más pesada a la más liviana, siempre al shard con menos carga
+    shards = [{'shard': i, 'segundos_estimados': 0, 'tareas': []} for i in range(n_shards)]
+    cargas = [(0, i) for i in range(n_shards)]
+    for tarea in sorted(tareas, key=lambda t: (-t['segundos_estimados'], t['destino'], t['parte'])):
+        carga, i = heapq.heappop(cargas)
+        shards[i]['tareas'].append(tarea)
+        shards[i]['segundos_estimados'] += tarea['segundos_estimados']
+        heapq.heappush(cargas, (carga + tarea['segundos_estimados'], i))
+
+    return {'creado': datetime.now().isoformat(timespec='seconds'),
+            'fuente_costos': 'historial' if medidos else 'catalogo',
+            'shards': shards}
+
+
+def cmd_planificar(args):
+    plan = planificar(leer_destinos(args.destinos), args.shards, args.historial, args.horas_objetivo)
+    with open(args.plan, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+
+    print(f"🗂️ {len(plan['shards'])} shards (costos desde {plan['fuente_costos']}):")
+    for shard in plan['shards']:
+        horas = shard['segundos_estimados'] / 3600
+        aviso = " ⚠️ supera el límite" if horas > HORAS_LIMITE else ""
+        print(f"   - shard {shard['shard']}: {len(shard['tareas'])} tareas, ~{horas:.1f} h{aviso}")
+
+    salida = os.environ.get('GITHUB_OUTPUT')
+    if salida:
+        with open(salida, 'a', encoding='utf-8') as f:
+            f.write(f"matriz={json.dumps({'shard': [s['shard'] for s in plan['shards']]})}\n")
+
+
+def _guardar_estado(ruta, estado):
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def _copiar_desde_cache(cache, tarea):
+    """Trae a resultados/ las marcas del destino y el progreso de la tarea guardados en la caché."""
+    for nombre in (f"marcas_{nombre_destino(tarea['destino'])}.json",
+                   f"progreso_{nombre_destino(tarea['destino'], tarea['parte'], tarea['partes'])}.txt"):
+        origen, copia = os.path.join(cache, nombre), os.path.join(CARPETA_RESULTADOS, nombre)
+        # Si ya está (otra parte del mismo destino corrió antes en este shard), manda la local
+        if os.path.exists(origen) and not os.path.exists(copia):
+            shutil.copy2(origen, copia)
+
+
+def cmd_ejecutar(args):
+    with open(args.plan, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    shard = plan['shards'][args.shard]
+    os.makedirs(CARPETA_RESULTADOS, exist_ok=True)
+    ruta_estado = os.path.join(CARPETA_RESULTADOS, f"estado_shard_{args.shard}.json")
+    estado = {'shard': args.shard, 'tareas': []}
+
+    for tarea in shard['tareas']:
+        comando = [sys.executable, '-u', 'reviews_destino.py', tarea['destino']]
+        if tarea['partes'] > 1:
+            comando += ['--parte', f"{tarea['parte']}/{tarea['partes']}"]
+        print(f"\n▶️ Shard {args.shard}: {tarea['destino']} (parte {tarea['parte']}/{tarea['partes']})", flush=True)
+        if args.marcas:
+            _copiar_desde_cache(args.marcas, tarea)
+
+        inicio = time.monotonic()
+        codigo = subprocess.call(comando)
+        estado['tareas'].append({'destino': tarea['destino'], 'parte': tarea['parte'], 'partes': tarea['partes'],
+                                 'codigo': codigo, 'segundos': round(time.monotonic() - inicio)})
+        # Se guarda tras cada tarea: si el job se corta, queda constancia de lo terminado
+        _guardar_estado(ruta_estado, estado)
+
+    fallidas = sum(1 for t in estado['tareas'] if t['codigo'] != 0)
+    print(f"\n🏁 Shard {args.shard}: {len(estado['tareas']) - fallidas} tareas bien, {fallidas} con error.", flush=True)
+
+
+def cmd_verificar(args):
+    with open(args.plan, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    hechas = {}
+    for estado in leer_estados(args.dir):
+        for tarea in estado.get('tareas', []):
+            clave = (tarea['destino'], tarea['parte'], tarea['partes'])
+            if hechas.get(clave) != 0:  # Con que un intento haya terminado bien, alcanza
+                hechas[clave] = tarea['codigo']
+
+    faltantes, fallidas = [], []
+    for shard in plan['shards']:
+        for tarea in shard['tareas']:
+            clave = (tarea['destino'], tarea['parte'], tarea['partes'])
+            if clave not in hechas:
+                faltantes.append((shard['shard'], clave))
+            elif hechas[clave] != 0:
+                fallidas.append((shard['shard'], clave))
+
+    total = sum(len(s['tareas']) for s in plan['shards'])
+    print(f"🔎 {total - len(faltantes) - len(fallidas)}/{total} tareas completas.")
+    for titulo, lista in (("Sin resultado", faltantes), ("Con error", fallidas)):
+        for shard, (destino, parte, partes) in lista:
+            print(f"   ❌ {titulo}: {destino} (parte {parte}/{partes}, shard {shard})")
+    if faltantes or fallidas:
+        sys.exit(1)
+    print("✅ Cobertura completa: se puede correr unir_csv.py.")
+
+
+def cmd_marcas(args):
+    os.makedirs(args.cache, exist_ok=True)
+
+    # Marcas: por destino se juntan la copia de la caché y la de cada shard que lo corrió
+    por_archivo = {}
+    rutas = glob.glob(os.path.join(args.cache, 'marcas_*.json')) + glob.glob(os.path.join(args.dir, '*', 'marcas_*.json'))
+    for ruta in sorted(rutas):
+        por_archivo.setdefault(os.path.basename(ruta), []).append(ruta)
+    for nombre, copias in por_archivo.items():
+        guardar_marcas(os.path.join(args.cache, nombre), unir_marcas(copias))
+
+    # Progreso: las tareas que corrieron dejan el suyo solo si no terminaron la pasada;
+    # el de las tareas que no llegaron a correr se conserva de la caché
+    corridas = {nombre_destino(t['destino'], t['parte'], t['partes'])
+                for estado in leer_estados(args.dir) for t in estado.get('tareas', [])}
+    for ruta in glob.glob(os.path.join(args.cache, 'progreso_*.txt')):
+        if os.path.basename(ruta)[len('progreso_'):-len('.txt')] in corridas:
+            os.remove(ruta)
+    pendientes = glob.glob(os.path.join(args.dir, '*', 'progreso_*.txt'))
+    for ruta in pendientes:
+        shutil.copy2(ruta, args.cache)
+
+    print(f"🔖 Marcas de {len(por_archivo)} destinos y {len(pendientes)} progresos sin terminar en {args.cache}/")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shards parejos para el scraping de opiniones por destino.")
+    parser.add_argument("--plan", default=ARCHIVO_PLAN)
+    etapas = parser.add_subparsers(dest="etapa", required=True)
+
+    p = etapas.add_parser("planificar", help="Arma el plan y la matriz del workflow")
+    p.add_argument("--destinos", default=ARCHIVO_DESTINOS, help="Un destino 'Ciudad, País' por línea")
+    p.add_argument("--shards", type=int, help="Cantidad de shards (por defecto, según HORAS_OBJETIVO y SHARDS_EN_PARALELO)")
+    p.add_argument("--horas-objetivo", type=float, default=HORAS_OBJETIVO)
+    p.add_argument("--historial", help=f"Carpeta con los resultados-*.zip de corridas anteriores (p. ej. {CARPETA_ZIPS})")
+    p.set_defaults(funcion=cmd_planificar)
+
+    p = etapas.add_parser("ejecutar", help="Corre las tareas de un shard")
+    p.add_argument("--shard", type=int, required=True)
+    p.add_argument("--marcas", help=f"Caché con marcas y progreso de corridas anteriores (p. ej. {CARPETA_MARCAS})")
+    p.set_defaults(funcion=cmd_ejecutar)
+
+    p = etapas.add_parser("verificar", help="Revisa que todas las tareas del plan terminaron")
+    p.add_argument("--dir", default=CARPETA_ARTEFACTOS, help="Carpeta con los estados de esta corrida (sueltos o en zips)")
+    p.set_defaults(funcion=cmd_verificar)
+
+    p = etapas.add_parser("marcas", help="Junta las marcas y el progreso de los shards en la caché")
+    p.add_argument("--dir", default=CARPETA_ARTEFACTOS, help="Carpeta con los resultados de esta corrida")
+    p.add_argument("--cache", default=CARPETA_MARCAS)
+    p.set_defaults(funcion=cmd_marcas)
+
+    args = parser.parse_args()
+    args.funcion(args)
+
+
+if __name__ == "__main__":
+    main()
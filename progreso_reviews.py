@@ -0,0 +1,80 @@
+"""
+Diario de progreso de una corrida de reviews.py (un país), para poder reanudarla.
+
+Guarda en un JSON:
+  - destinos: actividades ya listadas de cada destino (no se vuelve a listar)
+  - actividades: por URL, la última página de opiniones guardada, los ordinales
+    de las huellas hasta esa página y si terminó
+
+Se reescribe de forma atómica (archivo temporal + os.replace), como mucho cada
+INTERVALO_GUARDADO segundos salvo que se fuerce. Si la corrida se corta, lo
+perdido son unos segundos de páginas, y las huellas evitan repetir filas.
+"""
+import json
+import os
+import time
+
+INTERVALO_GUARDADO = 5  # segundos
+
+
+class DiarioProgreso:
+    def __init__(self, ruta, desde_cero=False):
+        self.ruta = ruta
+        self.datos = {'destinos': {}, 'actividades': {}}
+        self._ultimo_guardado = 0.0
+        if os.path.exists(ruta) and not desde_cero:
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    self.datos.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer el progreso de {ruta} ({e}). Se empieza de cero.", flush=True)
+
+    # --- Destinos ---
+    def actividades_de(self, slug_destino):
+        """Actividades listadas en una corrida anterior (None si el destino no se listó)."""
+        return self.datos['destinos'].get(slug_destino)
+
+    def guardar_destino(self, slug_destino, actividades):
+        self.datos['destinos'][slug_destino] = actividades
+        self.guardar(forzar=True)
+
+    # --- Actividades ---
+    def completada(self, url):
+        return self.datos['actividades'].get(url, {}).get('completa', False)
+
+    def ultima_pagina(self, url):
+        return self.datos['actividades'].get(url, {}).get('pagina', 0)
+
+    def ordinales(self, url):
+        """Ordinales de las huellas al cerrar la última página (None en diarios sin ese dato)."""
+        return self.datos['actividades'].get(url, {}).get('ordinales')
+
+    def pagina_guardada(self, url, pagina, ordinales):
+        self.datos['actividades'][url] = {'pagina': pagina, 'ordinales': ordinales, 'completa': False}
+        self.guardar()
+
+    def completar(self, url):
+        estado = self.datos['actividades'].setdefault(url, {'pagina': 0})
+        estado.pop('ordinales', None)
+        estado['completa'] = True
+        self.guardar()
+
+    def reiniciar(self):
+        """País terminado: se borra el diario para que la próxima corrida lo recorra de nuevo."""
+        self.datos = {'destinos': {}, 'actividades': {}}
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+    def resumen(self):
+        actividades = self.datos['actividades'].values()
+        return len(self.datos['destinos']), sum(1 for a in actividades if a.get('completa'))
+
+    def guardar(self, forzar=False):
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_guardado < INTERVALO_GUARDADO:
+            return
+        temporal = self.ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self.datos, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+        self._ultimo_guardado = ahora
@@ -0,0 +1,358 @@
+"""
+Índice persistente de operadores (entity resolution) entre Civitatis, GYG, Viator y ANATO.
+
+Cada registro de una fuente (plataforma + operador) se resuelve contra las entidades
+ya conocidas usando claves de bloqueo indexadas en SQLite:
+  - dominio: del email (salvo correos gratuitos) o del sitio web
+  - telefono: solo dígitos, últimos 9 (ignora prefijos de país)
+  - nombre: nombre canónico (sin acentos, puntuación ni sufijos societarios)
+  - token: palabras del nombre, para la coincidencia difusa (Dice de trigramas)
+Así cada registro nuevo cuesta unas pocas consultas indexadas, sin comparar contra todos.
+
+Uso:
+    python resolucion_operadores.py                  -> resuelve lo nuevo y exporta la cobertura
+    python resolucion_operadores.py buscar "Nombre"  -> en qué plataformas está un operador
+"""
+import csv
+import glob
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from normalizacion import normalizar_texto
+
+# --- CONFIGURACIÓN ---
+ARCHIVO_INDICE = 'operadores.db'
+ARCHIVO_COBERTURA = 'cobertura_operadores.csv'
+
+# Dos nombres se consideran la misma empresa desde este Dice de trigramas
+UMBRAL_NOMBRE = 0.85
+# Tokens más frecuentes que esto ("tours", "travel"...) no sirven para bloquear
+MAX_ENTIDADES_POR_TOKEN = 50
+# Claves fuertes con el mismo tope: un teléfono de central o un nombre genérico no identifican a nadie
+FUERTES_CON_TOPE = {'telefono', 'nombre'}
+# Para `buscar` (consulta manual) se muestran también parecidos más lejanos
+UMBRAL_BUSQUEDA = 0.6
+
+# Correos gratuitos: se comparan por el nombre del proveedor (gmail.com, yahoo.com.ar, hotmail.it...)
+PROVEEDORES_CORREO = {
+    'gmail', 'googlemail', 'hotmail', 'outlook', 'live', 'msn', 'yahoo', 'ymail', 'rocketmail', 'icloud',
+    'me', 'mac', 'aol', 'protonmail', 'proton', 'gmx', 'web', 'mail', 'yandex', 'qq', '126', '163', 'sina',
+    'naver', 'hanmail', 'libero', 'virgilio', 'alice', 'tiscali', 'orange', 'wanadoo', 'free', 'sfr',
+    'laposte', 'uol', 'bol', 'terra', 'ig', 'seznam', 'wp', 'o2', 't-online', 'btinternet', 'sky',
+    'comcast', 'att', 'verizon', 'telefonica', 'movistar', 'arnet', 'fibertel', 'speedy', 'prodigy',
+}
+# Dominios compartidos por miles de negocios: no identifican a nadie
+DOMINIOS_GENERICOS = {
+    'facebook.com', 'instagram.com', 'wa.me', 'whatsapp.com', 'linktr.ee', 'wixsite.com',
+    'google.com', 'business.site', 'tripadvisor.com', 'civitatis.com', 'getyourguide.com', 'viator.com',
+}
+
+SUFIJOS_SOCIETARIOS = {
+    'sa', 'sas', 'srl', 'spa', 'ltda', 'ltd', 'llc', 'inc', 'eirl', 'sac', 'cia', 'sl', 'slu',
+    'gmbh', 'corp', 'co', 'eireli', 'me', 'limitada', 'de', 'cv',
+}
+
+# Incluye el marcador que pone drivers/civitatis_operadores.py cuando la actividad no lista operadores
+VALORES_VACIOS = {'', 'n/a', 'nan', 'none', 'desconocido', '-', 'no especificado / único'}
+
+# Fuentes: (plataforma, patrón de archivos, opciones de lectura, columnas -> campo)
+FUENTES = [
+    ('Civitatis', 'data/operadores_*.csv', {'sep': ';', 'encoding': 'utf-8-sig'},
+     {'operador': 'nombre', 'email': 'email', 'telefono': 'telefono', 'direccion': 'direccion', 'pais': 'pais'}),
+    ('GYG', 'gyg/metadata_latam_BQ.csv', {'sep': ';', 'encoding': 'utf-8-sig', 'quoting': csv.QUOTE_NONE},
+     {'proveedor': 'nombre', 'pais': 'pais'}),
+    ('Viator', 'viator/viator_con_proveedores.csv', {'encoding': 'utf-8'},
+     {'Trading Name': 'nombre', 'Legal Name': 'razon_social', 'Email': 'email', 'Phone': 'telefono',
+      'Website': 'web', 'Address': 'direccion'}),
+    ('ANATO', 'expositores_anato_final.csv', {'encoding': 'utf-8-sig'},
+     {'Título': 'nombre', 'Sitio Web': 'web', 'Origen': 'pais'}),
+]
+
+CAMPOS = ['nombre', 'razon_social', 'email', 'telefono', 'web', 'direccion', 'pais']
+
+
+# --- NORMALIZACIÓN Y CLAVES ---
+
+def valor(texto):
+    if texto is None or pd.isna(texto):
+        return ''
+    texto = str(texto).strip()
+    return '' if texto.lower() in VALORES_VACIOS else texto
+
+
+def nombre_canonico(nombre):
+    texto = re.sub(r'[^a-z0-9 ]+', ' ', normalizar_texto(nombre))
+    tokens = [t for t in texto.split() if t not in SUFIJOS_SOCIETARIOS]
+    return " ".join(tokens)
+
+
+def dominio(texto):
+    texto = normalizar_texto(texto)
+    if not texto:
+        return ''
+    if '@' in texto:
+        texto = texto.rsplit('@', 1)[1]
+    else:
+        texto = re.sub(r'^[a-z]+://', '', texto).split('/')[0]
+    texto = texto.split(':')[0].strip('. ')
+    if texto.startswith('www.'):
+        texto = texto[4:]
+    if '.' not in texto or texto in DOMINIOS_GENERICOS:
+        return ''
+    return texto
+
+
+def telefono_normalizado(telefono):
+    digitos = re.sub(r'\D+', '', str(telefono))
+    return digitos[-9:] if len(digitos) >= 7 else ''
+
+
+def trigramas(texto):
+    texto = f" {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def dice(a, b):
+    ta, tb = trigramas(a), trigramas(b)
+    return 2.0 * len(ta & tb) / (len(ta) + len(tb)) if ta and tb else 0.0
+
+
+def claves_bloqueo(registro):
+    """Claves fuertes (identifican por sí solas) y tokens del nombre (solo candidatos)."""
+    fuertes = set()
+    email_dom = dominio(registro.get('email', ''))
+    if email_dom and email_dom.split('.')[0] not in PROVEEDORES_CORREO:
+        fuertes.add(('dominio', email_dom))
+    web_dom = dominio(registro.get('web', ''))
+    if web_dom:
+        fuertes.add(('dominio', web_dom))
+    tel = telefono_normalizado(registro.get('telefono', ''))
+    if tel:
+        fuertes.add(('telefono', tel))
+
+    tokens = set()
+    for campo in ('nombre', 'razon_social'):
+        canonico = nombre_canonico(registro.get(campo, ''))
+        if canonico:
+            fuertes.add(('nombre', canonico))
+            tokens.update(('token', t) for t in canonico.split() if len(t) >= 3)
+    return fuertes, tokens
+
+
+# --- ÍNDICE ---
+
+def conectar(ruta=ARCHIVO_INDICE):
+    conn = sqlite3.connect(ruta)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS entidades (
+            entidad_id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            nombre_canonico TEXT NOT NULL,
+            fecha_alta TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS registros (
+            plataforma TEXT NOT NULL,
+            id_fuente TEXT NOT NULL,
+            nombre TEXT, razon_social TEXT, email TEXT, telefono TEXT, web TEXT, direccion TEXT, pais TEXT,
+            entidad_id INTEGER NOT NULL REFERENCES entidades (entidad_id),
+            regla TEXT NOT NULL,
+            fecha_alta TEXT NOT NULL,
+            PRIMARY KEY (plataforma, id_fuente)
+        );
+        CREATE INDEX IF NOT EXISTS idx_registros_entidad ON registros (entidad_id);
+
+        CREATE TABLE IF NOT EXISTS claves (
+            tipo TEXT NOT NULL,
+            valor TEXT NOT NULL,
+            entidad_id INTEGER NOT NULL,
+            PRIMARY KEY (tipo, valor, entidad_id)
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def id_fuente(registro):
+    """Un operador por plataforma: mismo nombre + email + teléfono = mismo registro."""
+    return "|".join([
+        nombre_canonico(registro.get('nombre', '')),
+        normalizar_texto(registro.get('email', '')),
+        telefono_normalizado(registro.get('telefono', '')),
+    ])
+
+
+def _entidades_con_clave(conn, tipo, valor_clave):
+    return [r[0] for r in conn.execute(
+        "SELECT entidad_id FROM claves WHERE tipo = ? AND valor = ? LIMIT ?",
+        (tipo, valor_clave, MAX_ENTIDADES_POR_TOKEN + 1)
+    )]
+
+
+def resolver(conn, registro, fecha):
+    """Devuelve (entidad_id, regla). Crea la entidad si no coincide con ninguna."""
+    fuertes, tokens = claves_bloqueo(registro)
+    canonico = nombre_canonico(registro.get('nombre', ''))
+
+    # 1. Claves fuertes: gana la entidad con más claves en común
+    votos = {}
+    for tipo, valor_clave in fuertes:
+        encontrados = _entidades_con_clave(conn, tipo, valor_clave)
+        if tipo in FUERTES_CON_TOPE and len(encontrados) > MAX_ENTIDADES_POR_TOKEN:
+            continue
+        for entidad_id in encontrados:
+            votos.setdefault(entidad_id, set()).add(tipo)
+    if votos:
+        entidad_id = max(sorted(votos), key=lambda e: len(votos[e]))
+        regla = "+".join(sorted(votos[entidad_id]))
+    else:
+        # 2. Difuso: solo contra las entidades que comparten algún token poco frecuente
+        entidad_id, regla, mejor = None, None, UMBRAL_NOMBRE
+        candidatos = set()
+        for tipo, valor_clave in tokens:
+            encontrados = _entidades_con_clave(conn, tipo, valor_clave)
+            if len(encontrados) <= MAX_ENTIDADES_POR_TOKEN:
+                candidatos.update(encontrados)
+        for candidato in sorted(candidatos):
+            nombre_candidato = conn.execute(
+                "SELECT nombre_canonico FROM entidades WHERE entidad_id = ?", (candidato,)
+            ).fetchone()[0]
+            puntaje = dice(canonico, nombre_candidato)
+            if puntaje >= mejor:
+                entidad_id, regla, mejor = candidato, f"difuso:{puntaje:.2f}", puntaje
+
+    # 3. Nueva entidad
+    if entidad_id is None:
+        entidad_id = conn.execute(
+            "INSERT INTO entidades (nombre, nombre_canonico, fecha_alta) VALUES (?, ?, ?)",
+            (registro.get('nombre', ''), canonico, fecha)
+        ).lastrowid
+        regla = 'nueva'
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO claves VALUES (?, ?, ?)",
+        [(tipo, valor_clave, entidad_id) for tipo, valor_clave in fuertes | tokens]
+    )
+    return entidad_id, regla
+
+
+def _leer_csv(archivo, opciones):
+    try:
+        return pd.read_csv(archivo, dtype=str, **opciones)
+    except UnicodeDecodeError:
+        # Algún export viejo viene de Excel: latin-1 y, según cómo se guardó, separado por tabs
+        with open(archivo, 'r', encoding='latin-1') as f:
+            cabecera = f.readline()
+        sep = opciones.get('sep', ',')
+        if sep not in cabecera and '\t' in cabecera:
+            sep = '\t'
+        return pd.read_csv(archivo, dtype=str, **{**opciones, 'encoding': 'latin-1', 'sep': sep})
+
+
+def cargar_fuente(plataforma, patron, opciones, columnas):
+    """Lee los archivos de una fuente y devuelve registros únicos (dicts con CAMPOS)."""
+    archivos = sorted(glob.glob(patron))
+    if not archivos:
+        print(f"⚠️ {plataforma}: no se encontró {patron}. Saltando...")
+        return []
+
+    registros = {}
+    for archivo in archivos:
+        try:
+            df = _leer_csv(archivo, opciones)
+        except (UnicodeDecodeError, pd.errors.ParserError) as e:
+            print(f"⚠️ {plataforma}: no se pudo leer {archivo} ({e}). Saltando...")
+            continue
+        presentes = {c: campo for c, campo in columnas.items() if c in df.columns}
+        if 'nombre' not in presentes.values():
+            print(f"⚠️ {plataforma}: {archivo} no tiene columna de nombre. Saltando...")
+            continue
+        for fila in df[list(presentes)].rename(columns=presentes).to_dict('records'):
+            registro = {campo: valor(fila.get(campo)) for campo in CAMPOS}
+            if registro['nombre']:
+                registros.setdefault(id_fuente(registro), registro)
+    return list(registros.items())
+
+
+def actualizar(conn, fuentes=FUENTES):
+    """Resuelve solo los registros que todavía no están en el índice."""
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for plataforma, patron, opciones, columnas in fuentes:
+        registros = cargar_fuente(plataforma, patron, opciones, columnas)
+        conocidos = {r[0] for r in conn.execute("SELECT id_fuente FROM registros WHERE plataforma = ?", (plataforma,))}
+        nuevos = [(clave, r) for clave, r in registros if clave not in conocidos]
+        print(f"-> {plataforma}: {len(registros)} operadores | {len(nuevos)} nuevos a resolver")
+
+        reglas = {}
+        with conn:
+            for clave, registro in nuevos:
+                entidad_id, regla = resolver(conn, registro, fecha)
+                conn.execute(
+                    "INSERT INTO registros VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (plataforma, clave, *[registro[c] for c in CAMPOS], entidad_id, regla, fecha)
+                )
+                tipo_regla = regla.split(':')[0]
+                reglas[tipo_regla] = reglas.get(tipo_regla, 0) + 1
+        if reglas:
+            print("   ↳ " + " | ".join(f"{r}: {n}" for r, n in sorted(reglas.items())))
+
+
+# --- CONSULTAS ---
+
+def cobertura(conn):
+    """Una fila por entidad con las plataformas donde aparece."""
+    return pd.read_sql_query("""
+        SELECT e.entidad_id,
+               e.nombre,
+               GROUP_CONCAT(DISTINCT r.plataforma) AS plataformas,
+               COUNT(DISTINCT r.plataforma) AS n_plataformas,
+               GROUP_CONCAT(DISTINCT r.pais) AS paises
+        FROM entidades e
+        JOIN registros r ON r.entidad_id = e.entidad_id
+        GROUP BY e.entidad_id
+        ORDER BY n_plataformas DESC, e.nombre
+    """, conn)
+
+
+def buscar(conn, nombre):
+    """Plataformas (y nombres usados en cada una) de la entidad que corresponde a `nombre`."""
+    registro = {'nombre': nombre}
+    fuertes, tokens = claves_bloqueo(registro)
+    canonico = nombre_canonico(nombre)
+    candidatos = set()
+    for tipo, valor_clave in fuertes | tokens:
+        candidatos.update(_entidades_con_clave(conn, tipo, valor_clave))
+    puntajes = []
+    for entidad_id in candidatos:
+        nombre_entidad = conn.execute(
+            "SELECT nombre_canonico FROM entidades WHERE entidad_id = ?", (entidad_id,)
+        ).fetchone()[0]
+        puntajes.append((dice(canonico, nombre_entidad), entidad_id))
+    puntajes = [p for p in sorted(puntajes, reverse=True) if p[0] >= UMBRAL_BUSQUEDA][:5]
+    if not puntajes:
+        return pd.DataFrame()
+    marcadores = ",".join("?" * len(puntajes))
+    return pd.read_sql_query(f"""
+        SELECT entidad_id, plataforma, nombre, email, telefono, web, pais, regla
+        FROM registros WHERE entidad_id IN ({marcadores})
+        ORDER BY entidad_id, plataforma
+    """, conn, params=[e for _, e in puntajes])
+
+
+if __name__ == "__main__":
+    conn = conectar()
+    try:
+        if len(sys.argv) > 2 and sys.argv[1] == 'buscar':
+            resultado = buscar(conn, sys.argv[2])
+            print(resultado.to_string(index=False) if not resultado.empty else "No se encontró ningún operador parecido.")
+        else:
+            actualizar(conn)
+            df_cob = cobertura(conn)
+            df_cob.to_csv(ARCHIVO_COBERTURA, index=False, encoding='utf-8-sig')
+            print(f"\n✅ {len(df_cob)} operadores únicos. Cobertura guardada en {ARCHIVO_COBERTURA}")
+            print(df_cob['plataformas'].value_counts().head(10).to_string())
+    finally:
+        conn.close()
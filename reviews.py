@@ -1,47 +1,23 @@
 import asyncio
 import pandas as pd
-import json
 import os
 import csv
-import sys
-from datetime import datetime, timedelta
+import argparse
+from datetime import date, timedelta
 from urllib.parse import urljoin
 from playwright.async_api import async_playwright
+from catalogo_destinos import cargar_destinos_civitatis
+from fechas_reviews import parsear_fecha_civitatis, pais_desde_ubicacion
+from extraccion_reviews import leer_reviews_pagina, esperar_reviews_nuevas, descubrir_paginacion, firma_pagina
+from huellas_reviews import HuellasReviews
+from progreso_reviews import DiarioProgreso
 
 # --- CONFIGURACIÓN ---
-CONCURRENCIA_MAXIMA = 5   # Pestañas simultáneas
+CONCURRENCIA_MAXIMA = 5   # Pestañas simultáneas (trabajadores de opiniones)
+TAMANO_COLA = 200         # Actividades listadas por adelantado, como máximo
 TIMEOUT_ACTIVIDAD = 120   # 2 Minutos máx por actividad
 MAX_PAGINAS_REVIEWS = 100 # Evita bucles infinitos
 
-# --- DICCIONARIO MESES ---
-MESES_ES = {
-    "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
-    "jul": 7, "ago": 8, "sep": 9, "oct": 10, "nov": 11, "dic": 12
-}
-
-def parsear_fecha_civitatis(texto_fecha):
-    try:
-        texto = texto_fecha.strip()
-        partes = texto.split('/')
-        if len(partes) != 3: return None
-        dia = int(partes[0].strip())
-        mes_txt = partes[1].strip().lower()[:3] 
-        anio = int(partes[2].strip())
-        numero_mes = MESES_ES.get(mes_txt, 1) 
-        return datetime(anio, numero_mes, dia)
-    except:
-        return None
-
-def cargar_destinos_civitatis(paises):
-    try:
-        with open('destinos_civitatis.json', 'r', encoding='utf-8') as f:
-            todos = json.load(f)
-        paises_lower = [p.lower() for p in paises]
-        return [d for d in todos if d.get('nameCountry', '').lower() in paises_lower]
-    except Exception as e:
-        print(f"❌ Error leyendo JSON: {e}", flush=True)
-        return []
-
 class CivitatisTurboScraper:
     SELECTORS = {
         "container": ".o-search-list__item",
@@ -55,10 +31,14 @@ class CivitatisTurboScraper:
         "next_btn_reviews": ".o-pagination .next-element:not(.--deactivated)",
     }
 
-    def __init__(self, output_file):
+    def __init__(self, output_file, desde_cero=False):
         self.output_file = output_file
-        self.fecha_corte = datetime.now() - timedelta(days=730)
-        self.semaphore = asyncio.Semaphore(CONCURRENCIA_MAXIMA)
+        # Huellas de las opiniones ya escritas: evita filas repetidas entre destinos y corridas
+        self.huellas = HuellasReviews(os.path.splitext(output_file)[0] + "_huellas.txt")
+        # Diario de progreso: permite reanudar el país en otra corrida sin repetir trabajo
+        self.progreso = DiarioProgreso(os.path.splitext(output_file)[0] + "_progreso.json", desde_cero=desde_cero)
+        self.fecha_corte = date.today() - timedelta(days=730)
+        self.urls_pais = None
 
     async def run(self, nombre_pais):
         # Crear CSV
@@ -76,6 +56,9 @@ class CivitatisTurboScraper:
             return
 
         print(f"✅ {len(destinos)} destinos encontrados.", flush=True)
+        destinos_listados, completadas = self.progreso.resumen()
+        if destinos_listados or completadas:
+            print(f"♻️ Reanudando: {destinos_listados} destinos ya listados y {completadas} actividades completadas.", flush=True)
 
         async with async_playwright() as p:
             # Lanzar navegador optimizado para servidor
@@ -98,8 +81,19 @@ class CivitatisTurboScraper:
             # BLOQUEO DE RECURSOS (Velocidad x10)
             await context.route("**/*", self._block_heavy_resources)
 
-            for destino in destinos:
-                await self._procesar_destino_completo(context, nombre_pais, destino)
+            # Tubería: el listado de destinos va por delante llenando una cola global
+            # y un número fijo de trabajadores baja opiniones hasta terminar el país
+            cola = asyncio.Queue(maxsize=TAMANO_COLA)
+            await asyncio.gather(
+                self._listar_destinos(context, nombre_pais, destinos, cola),
+                *(self._trabajador(context, cola) for _ in range(CONCURRENCIA_MAXIMA))
+            )
+            if self.urls_pais is not None and all(self.progreso.completada(u) for u in self.urls_pais):
+                # Las huellas evitan filas repetidas cuando la próxima corrida recorra todo otra vez
+                self.progreso.reiniciar()
+                print(f"🏁 {nombre_pais} completo. Progreso reiniciado para la próxima corrida.", flush=True)
+            else:
+                self.progreso.guardar(forzar=True)
 
             await browser.close()
 
@@ -110,10 +104,48 @@ class CivitatisTurboScraper:
         else:
             await route.continue_()
 
-    async def _procesar_destino_completo(self, context, pais, destino_obj):
-        page = await context.new_page()
+    async def _listar_destinos(self, context, pais, destinos, cola):
+        """Productor: lista las actividades de cada destino y las encola (sin repetir URLs)."""
+        urls_vistas = set()
+        completadas = 0
+        listado_completo = False
+        try:
+            for destino_obj in destinos:
+                for base_data in await self._listar_destino(context, pais, destino_obj):
+                    if base_data['url_actividad'] in urls_vistas: continue
+                    urls_vistas.add(base_data['url_actividad'])
+                    if self.progreso.completada(base_data['url_actividad']):
+                        completadas += 1
+                        continue
+                    await cola.put(base_data)
+            listado_completo = True
+        finally:
+            # Una señal de fin por trabajador, aunque el listado falle
+            for _ in range(CONCURRENCIA_MAXIMA):
+                await cola.put(None)
+            # Actividades del país (None si el listado se cortó): al final se revisa si terminaron todas
+            self.urls_pais = urls_vistas if listado_completo else None
+            print(f"📋 Listado terminado: {len(urls_vistas) - completadas} actividades encoladas "
+                  f"({completadas} ya completadas antes).", flush=True)
+
+    async def _trabajador(self, context, cola):
+        """Consumidor: baja las opiniones de las actividades de la cola hasta recibir la señal de fin."""
+        while True:
+            base_data = await cola.get()
+            if base_data is None:
+                break
+            await self._scrape_reviews_safe(context, base_data)
+
+    async def _listar_destino(self, context, pais, destino_obj):
         nombre_destino = destino_obj['name']
         slug_destino = destino_obj['url'] # <--- Extraemos el slug del JSON (ej: santiago-de-chile)
+
+        listadas = self.progreso.actividades_de(slug_destino)
+        if listadas is not None:
+            print(f"\n🌍 {nombre_destino.upper()}: {len(listadas)} actividades ya listadas en una corrida anterior.", flush=True)
+            return listadas
+
+        page = await context.new_page()
         
         # La URL base siempre termina en slash
         url_destino_base = f"https://www.civitatis.com/es/{slug_destino}/"
@@ -129,21 +161,15 @@ class CivitatisTurboScraper:
         finally:
             await page.close()
 
-        if not actividades: return
-
-        print(f"   ↳ {len(actividades)} actividades válidas (Filtradas por URL). Procesando...", flush=True)
+        print(f"   ↳ {len(actividades)} actividades válidas (Filtradas por URL). Encolando...", flush=True)
 
-        # Crear tareas concurrentes
-        tareas = []
-        for act in actividades:
-            base_data = {
-                "pais": pais, "destino": nombre_destino,
-                "actividad": act['titulo'], "url_actividad": act['url']
-            }
-            tareas.append(self._scrape_reviews_safe(context, base_data))
-        
-        # Ejecutar lote
-        await asyncio.gather(*tareas)
+        listadas = [{
+            "pais": pais, "destino": nombre_destino,
+            "actividad": act['titulo'], "url_actividad": act['url']
+        } for act in actividades]
+        if listadas:
+            self.progreso.guardar_destino(slug_destino, listadas)
+        return listadas
 
     async def _get_activities_list(self, page, url_destino_base, slug_destino):
         """
@@ -229,13 +255,16 @@ class CivitatisTurboScraper:
         return actividades
 
     async def _scrape_reviews_safe(self, context, base_data):
-        """Wrapper con Semáforo y Timeout"""
-        async with self.semaphore:
-            try:
-                await asyncio.wait_for(self._extract_reviews_logic(context, base_data), timeout=TIMEOUT_ACTIVIDAD)
-            except asyncio.TimeoutError:
-                print(f"     ⏰ Timeout en {base_data['actividad']}. Saltando.", flush=True)
-            except Exception: pass
+        """Wrapper con Timeout (la concurrencia la fija el número de trabajadores)"""
+        self.huellas.iniciar_actividad(base_data['url_actividad'])
+        try:
+            await asyncio.wait_for(self._extract_reviews_logic(context, base_data), timeout=TIMEOUT_ACTIVIDAD)
+            self.progreso.completar(base_data['url_actividad'])
+        except asyncio.TimeoutError:
+            print(f"     ⏰ Timeout en {base_data['actividad']}. Saltando.", flush=True)
+        except Exception: pass
+        finally:
+            self.huellas.terminar_actividad(base_data['url_actividad'])
 
     async def _extract_reviews_logic(self, context, base_data):
         page = await context.new_page()
@@ -253,57 +282,95 @@ class CivitatisTurboScraper:
             if "opiniones" not in page.url: return
 
             paginas = 0
+            ultima = self.progreso.ultima_pagina(url)
+            ordinales = self.progreso.ordinales(url)
+            # Corrida anterior cortada a mitad de la actividad: seguimos desde la página siguiente,
+            # con los ordinales de las huellas donde quedaron (se cuentan desde la página 1)
+            if ultima and ordinales is not None and await self._saltar_a_pagina(page, url_opiniones, ultima + 1):
+                self.huellas.restaurar_ordinales(url, ordinales)
+                paginas = ultima
+
+            selectores = (self.SELECTORS["review_container"], self.SELECTORS["date_text"], self.SELECTORS["location"])
+            firmas = set()
+            firma_anterior = None
             while paginas < MAX_PAGINAS_REVIEWS:
-                batch = []
-                elements = await page.query_selector_all(self.SELECTORS["review_container"])
-                if not elements: break
-
-                for el in elements:
-                    try:
-                        date_el = await el.query_selector(self.SELECTORS["date_text"])
-                        date_text = await date_el.inner_text() if date_el else ""
-                        fecha_dt = parsear_fecha_civitatis(date_text)
-                        
-                        if fecha_dt:
-                            if fecha_dt < self.fecha_corte: continue # Ignorar vieja
-                            fecha_csv = fecha_dt.strftime("%Y-%m-%d")
-                        else:
-                            fecha_csv = date_text
-
-                        loc_el = await el.query_selector(self.SELECTORS["location"])
-                        if loc_el:
-                            raw_loc = await loc_el.inner_text()
-                            pais_usuario = raw_loc.replace("-", ",").replace("\n", " ").split(",")[-1].strip()
-                        else: pais_usuario = "N/A"
-
-                        batch.append({**base_data, "fecha": fecha_csv, "pais_usuario": pais_usuario})
-                    except: continue
-
-                self._save_incremental(batch)
+                # Todas las opiniones de la página en una sola llamada al navegador; tras un
+                # click se espera a que la lista cambie (si no, se volvería a leer la misma página)
+                if firma_anterior is None:
+                    reviews = await leer_reviews_pagina(page, *selectores)
+                else:
+                    reviews = await esperar_reviews_nuevas(page, firma_anterior, *selectores)
+                if not reviews: break
+                firma_anterior = firma_pagina(reviews)
+                if firma_anterior in firmas: break # Volvió a una página ya guardada
+                firmas.add(firma_anterior)
+
+                batch, huellas = self._filas_de_pagina(reviews, base_data)
+                self._save_incremental(batch, huellas)
+                self.progreso.pagina_guardada(url, paginas + 1, self.huellas.ordinales_de(url))
                 
                 next_btn = await page.query_selector(self.SELECTORS["next_btn_reviews"])
                 if next_btn and await next_btn.is_visible():
                     await page.evaluate("(el) => el.click()", next_btn)
-                    await asyncio.sleep(0.5) # Espera ligera
                     paginas += 1
                 else: break
         finally:
             await page.close()
 
-    def _save_incremental(self, data):
+    async def _saltar_a_pagina(self, page, url_opiniones, pagina):
+        """
+        Va directo a la página pedida si el botón "siguiente" es un enlace con número de página.
+        Si no se puede, deja el navegador en la página 1 y devuelve False (se rehace la actividad;
+        las huellas evitan repetir filas).
+        """
+        paginacion, hizo_click = await descubrir_paginacion(page, self.SELECTORS["next_btn_reviews"])
+        if paginacion and not paginacion.es_xhr:
+            await page.goto(paginacion.url(pagina), wait_until="domcontentloaded", timeout=45000)
+            return True
+        if hizo_click:
+            # El click llevó a la página 2, no a la pedida: volvemos al principio
+            await page.goto(url_opiniones, wait_until="domcontentloaded", timeout=45000)
+        return False
+
+    def _filas_de_pagina(self, reviews, base_data):
+        """Convierte las opiniones de una página en filas (con sus huellas), sin las viejas ni las ya escritas."""
+        batch, huellas = [], []
+        for review in reviews:
+            date_text = review['date_text']
+            fecha_dt = parsear_fecha_civitatis(date_text)
+
+            if fecha_dt:
+                if fecha_dt < self.fecha_corte: continue # Ignorar vieja
+                fecha_csv = fecha_dt.isoformat()
+            else:
+                fecha_csv = date_text
+
+            raw_loc = review['location_text']
+            huella = self.huellas.huella(base_data['url_actividad'], fecha_csv, raw_loc)
+            if not self.huellas.es_nueva(huella): continue
+
+            pais_usuario = pais_desde_ubicacion(raw_loc) if raw_loc is not None else "N/A"
+
+            batch.append({**base_data, "fecha": fecha_dt or fecha_csv, "pais_usuario": pais_usuario})
+            huellas.append(huella)
+        return batch, huellas
+
+    def _save_incremental(self, data, huellas):
         if not data: return
         try:
             df = pd.DataFrame(data)
             df.to_csv(self.output_file, mode='a', index=False, header=False, 
                       encoding='utf-8-sig', sep=';', quoting=csv.QUOTE_MINIMAL)
+            self.huellas.confirmar(huellas)
         except: pass
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        PAIS = sys.argv[1]
-    else:
-        PAIS = "Brasil"
-
-    nombre_archivo = f"reviews_{PAIS.lower().replace(' ', '_')}_paises.csv"
-    scraper = CivitatisTurboScraper(nombre_archivo)
-    asyncio.run(scraper.run(PAIS))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Opiniones de Civitatis de todos los destinos de un país.")
+    parser.add_argument("pais", nargs="?", default="Brasil")
+    parser.add_argument("--desde-cero", action="store_true",
+                        help="Ignora el progreso guardado y vuelve a recorrer todo el país")
+    args = parser.parse_args()
+
+    nombre_archivo = f"reviews_{args.pais.lower().replace(' ', '_')}_paises.csv"
+    scraper = CivitatisTurboScraper(nombre_archivo, desde_cero=args.desde_cero)
+    asyncio.run(scraper.run(args.pais))
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Cubo de opiniones: conteos por destino × actividad × mes × país del usuario.
+
+Vive en la misma base que arma unir_csv.py (BASE_CIVITATIS_COMPLETA.db). La
+primera vez se llena con un GROUP BY sobre todas las opiniones; después un
+trigger suma cada opinión nueva que entra a `reviews`, así que el cubo está
+siempre al día sin volver a leer las filas crudas.
+
+Uso:
+    python cubo_reviews.py                       -> exporta el cubo completo a CUBO_REVIEWS.csv
+    python cubo_reviews.py destino mes           -> totales por las dimensiones pedidas
+    python cubo_reviews.py pais_usuario --destino "Lima"
+"""
+import argparse
+import csv
+import sqlite3
+
+import pandas as pd
+
+ARCHIVO_BASE = 'BASE_CIVITATIS_COMPLETA.db'
+ARCHIVO_CUBO = 'CUBO_REVIEWS.csv'
+
+DIMENSIONES = ["pais", "destino", "actividad", "url_actividad", "mes", "pais_usuario"]
+# Fechas que no se pudieron leer (quedó el texto original) van a este mes
+SIN_FECHA = 'sin_fecha'
+
+
+def _mes(columna):
+    return (f"CASE WHEN {columna} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-*' "
+            f"THEN substr({columna}, 1, 7) ELSE '{SIN_FECHA}' END")
+
+
+def crear_cubo(conn):
+    """Crea y llena el cubo si no existe, y deja el trigger que lo mantiene al día."""
+    existe = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cubo_reviews'").fetchone()
+    if existe:
+        return
+    with conn:
+        conn.executescript(f"""
+            CREATE TABLE cubo_reviews (
+                pais TEXT, destino TEXT, actividad TEXT, url_actividad TEXT,
+                mes TEXT, pais_usuario TEXT, n INTEGER NOT NULL,
+                PRIMARY KEY (destino, url_actividad, mes, pais_usuario)
+            ) WITHOUT ROWID;
+            CREATE INDEX cubo_por_mes ON cubo_reviews (mes, destino);
+            CREATE INDEX cubo_por_pais_usuario ON cubo_reviews (pais_usuario, mes);
+
+            INSERT INTO cubo_reviews
+            SELECT MAX(pais), destino, MAX(actividad), url_actividad, {_mes('fecha')} AS mes, pais_usuario, COUNT(*)
+            FROM reviews
+            GROUP BY destino, url_actividad, mes, pais_usuario;
+
+            CREATE TRIGGER cubo_al_insertar AFTER INSERT ON reviews
+            BEGIN
+                INSERT INTO cubo_reviews
+                VALUES (NEW.pais, NEW.destino, NEW.actividad, NEW.url_actividad, {_mes('NEW.fecha')}, NEW.pais_usuario, 1)
+                ON CONFLICT (destino, url_actividad, mes, pais_usuario) DO UPDATE SET n = n + 1;
+            END;
+        """)
+
+
+def consultar(conn, dimensiones, destino=None):
+    """Totales del cubo agrupados por las dimensiones pedidas (y opcionalmente un destino)."""
+    columnas = ", ".join(dimensiones)
+    filtro, parametros = ("WHERE destino = ?", (destino,)) if destino else ("", ())
+    return pd.read_sql_query(
+        f"SELECT {columnas}, SUM(n) AS reviews FROM cubo_reviews {filtro} GROUP BY {columnas} ORDER BY {columnas}",
+        conn, params=parametros
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conteos de opiniones por destino, actividad, mes y país del usuario.")
+    parser.add_argument("dimensiones", nargs="*", metavar="dimension",
+                        help=f"Agrupar por: {', '.join(DIMENSIONES)} (por defecto, todas)")
+    parser.add_argument("--destino", help="Solo este destino")
+    parser.add_argument("--salida", default=ARCHIVO_CUBO)
+    args = parser.parse_args()
+    invalidas = [d for d in args.dimensiones if d not in DIMENSIONES]
+    if invalidas:
+        parser.error(f"dimensiones no válidas: {', '.join(invalidas)}")
+
+    conn = sqlite3.connect(ARCHIVO_BASE)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reviews'").fetchone():
+        print(f"⚠️ '{ARCHIVO_BASE}' no tiene opiniones. Corré primero unir_csv.py.")
+        return
+    crear_cubo(conn)
+
+    df = consultar(conn, args.dimensiones or DIMENSIONES, args.destino)
+    conn.close()
+    df.to_csv(args.salida, sep=';', index=False, encoding='utf-8-sig', quoting=csv.QUOTE_MINIMAL)
+    print(f"✅ {len(df)} filas agregadas ({df['reviews'].sum()} opiniones) en '{args.salida}'.")
+
+
+if __name__ == "__main__":
+    main()
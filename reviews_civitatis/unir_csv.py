@@ -1,43 +1,172 @@
+"""
+Consolida las opiniones de los resultados-*.zip del workflow en una base SQLite.
+
+Cada CSV se lee por partes directo desde el zip (memoria constante, sin importar
+cuántos shards haya) y se inserta con una clave hash de
+(url_actividad, fecha, pais_usuario, ordinal). El ordinal numera las opiniones
+repetidas con los mismos datos dentro de un archivo: dos opiniones reales del
+mismo día y país se conservan, y la misma opinión bajada en dos shards se guarda
+una sola vez. Los CSV ya cargados (mismo nombre, CRC y tamaño) se saltan.
+
+Limitación conocida: el ordinal arranca en 0 en cada CSV. Con las marcas de
+reviews_destino.py, una corrida incremental trae solo las opiniones nuevas; si
+una cae el mismo día y país que otra ya guardada de esa actividad (el día de la
+marca), recibe el ordinal 0, choca con la clave existente y se descarta. No se
+arranca desde el conteo de la base porque entonces una descarga completa, o la
+misma actividad bajada en dos destinos, duplicaría las opiniones. Para recuperar
+esas opiniones, correr reviews_destino.py --refresco-completo y volver a consolidar.
+
+Al final se exporta BASE_CIVITATIS_COMPLETA.csv desde la base, también por partes.
+La misma base mantiene el cubo de conteos (ver cubo_reviews.py).
+"""
+import csv
+import hashlib
 import os
-import pandas as pd
+import sqlite3
+import sys
 import zipfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cubo_reviews import crear_cubo
+
+# fechas_reviews.py vive en la raíz del repo (compartido con los scrapers)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fechas_reviews import parsear_fechas
+
+ARCHIVO_BASE = 'BASE_CIVITATIS_COMPLETA.db'
+ARCHIVO_SALIDA = 'BASE_CIVITATIS_COMPLETA.csv'
+TAMANO_CHUNK = 50000
+
+COLUMNAS = ["pais", "destino", "actividad", "url_actividad", "fecha", "pais_usuario"]
+COLUMNAS_CLAVE = ["url_actividad", "fecha", "pais_usuario"]
+
+
+def abrir_base(ruta=ARCHIVO_BASE):
+    conn = sqlite3.connect(ruta)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS reviews (
+            clave INTEGER PRIMARY KEY,
+            pais TEXT, destino TEXT, actividad TEXT, url_actividad TEXT,
+            fecha TEXT, pais_usuario TEXT, ordinal INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS shards (
+            miembro TEXT, crc INTEGER, tamano INTEGER,
+            zip TEXT, filas INTEGER, nuevas INTEGER, cargado TEXT,
+            PRIMARY KEY (miembro, crc, tamano)
+        );
+    """)
+    # Conteos por destino × actividad × mes × país del usuario, al día con cada inserción
+    crear_cubo(conn)
+    return conn
+
+
+def clave_review(url, fecha, pais_usuario, ordinal):
+    """Entero de 64 bits estable entre corridas (no depende del hash de Python ni de pandas)."""
+    texto = f"{url}|{fecha}|{pais_usuario}|{ordinal}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(texto, digest_size=8).digest(), 'big', signed=True)
+
+
+def _agregar_ordinal(chunk, vistos):
+    """
+    Ordinal de cada (url, fecha, pais_usuario) dentro del archivo, siguiendo entre chunks.
+    Empieza en 0 en cada CSV (ver la limitación en el docstring del módulo).
+    """
+    triple = chunk[COLUMNAS_CLAVE[0]].str.cat(chunk[COLUMNAS_CLAVE[1:]], sep='|')
+    previos = triple.map(vistos).fillna(0).astype(int)
+    chunk['ordinal'] = previos + triple.groupby(triple).cumcount()
+    for valor, n in triple.value_counts().items():
+        vistos[valor] = vistos.get(valor, 0) + n
+    return chunk
+
+
+def cargar_csv(conn, z, info):
+    """Inserta un CSV del zip por partes. Devuelve (filas leídas, filas nuevas)."""
+    filas = nuevas = 0
+    vistos = {}
+    with z.open(info) as f:
+        lector = pd.read_csv(f, sep=';', encoding='utf-8-sig', dtype=str,
+                             keep_default_na=False, chunksize=TAMANO_CHUNK)
+        for chunk in lector:
+            chunk = chunk.reindex(columns=COLUMNAS, fill_value="")
+            # Fechas en cualquier formato de opinión -> AAAA-MM-DD (cada texto distinto se lee una vez)
+            fechas = parsear_fechas(chunk['fecha'])
+            chunk['fecha'] = np.where(fechas.notna(), np.datetime_as_string(fechas.to_numpy(), unit='D'), chunk['fecha'])
+            chunk = _agregar_ordinal(chunk, vistos)
+            claves = [clave_review(*fila) for fila in
+                      zip(chunk['url_actividad'], chunk['fecha'], chunk['pais_usuario'], chunk['ordinal'])]
+            # rowcount cuenta solo las filas insertadas (no las que toca el trigger del cubo)
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(claves, *(chunk[c] for c in COLUMNAS), chunk['ordinal'].tolist())
+            )
+            filas += len(chunk)
+            nuevas += cursor.rowcount
+    return filas, nuevas
+
+
+def exportar_csv(conn, archivo_salida=ARCHIVO_SALIDA):
+    columnas = ", ".join(COLUMNAS)
+    primera = True
+    for chunk in pd.read_sql_query(f"SELECT {columnas} FROM reviews ORDER BY url_actividad, fecha DESC, ordinal",
+                                   conn, chunksize=TAMANO_CHUNK):
+        chunk.to_csv(archivo_salida, sep=';', index=False, header=primera, mode='w' if primera else 'a',
+                     encoding='utf-8-sig' if primera else 'utf-8', quoting=csv.QUOTE_MINIMAL)
+        primera = False
+    if primera:
+        pd.DataFrame(columns=COLUMNAS).to_csv(archivo_salida, sep=';', index=False, encoding='utf-8-sig')
+
 
 def consolidar_zips():
     print("🔄 Buscando archivos ZIP en la carpeta actual...")
-    archivos_zip = [f for f in os.listdir('.') if f.endswith('.zip')]
-    
+    archivos_zip = sorted(f for f in os.listdir('.') if f.endswith('.zip'))
+
     if not archivos_zip:
         print("⚠️ No se encontraron archivos .zip en la carpeta.")
         return
 
-    df_list = []
-    
+    conn = abrir_base()
+    cargados = 0
     for archivo in archivos_zip:
         try:
             # Abrimos el ZIP sin extraerlo en el disco
             with zipfile.ZipFile(archivo, 'r') as z:
-                for filename in z.namelist():
+                for info in z.infolist():
                     # Solo leemos los archivos CSV que NO sean los viejos de países
-                    if filename.endswith('.csv') and 'paises' not in filename:
-                        print(f"   📥 Extrayendo: {filename} (desde {archivo})")
-                        with z.open(filename) as f:
-                            df = pd.read_csv(f, sep=';', encoding='utf-8-sig')
-                            df_list.append(df)
+                    if not info.filename.endswith('.csv') or 'paises' in info.filename:
+                        continue
+                    ya_cargado = conn.execute(
+                        "SELECT 1 FROM shards WHERE miembro = ? AND crc = ? AND tamano = ?",
+                        (info.filename, info.CRC, info.file_size)
+                    ).fetchone()
+                    if ya_cargado:
+                        continue
+
+                    filas, nuevas = cargar_csv(conn, z, info)
+                    conn.execute(
+                        "INSERT INTO shards VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (info.filename, info.CRC, info.file_size, archivo, filas, nuevas,
+                         datetime.now().isoformat(timespec='seconds'))
+                    )
+                    conn.commit()
+                    cargados += 1
+                    print(f"   📥 {info.filename} (desde {archivo}): {filas} filas, {nuevas} nuevas")
         except Exception as e:
+            conn.rollback()
             print(f"❌ Error leyendo el zip {archivo}: {e}")
 
-    if df_list:
-        print("\n⚙️ Uniendo todos los datos...")
-        df_final = pd.concat(df_list, ignore_index=True)
-        
-        # Eliminar posibles duplicados absolutos
-        df_final = df_final.drop_duplicates()
-        
-        archivo_salida = 'BASE_CIVITATIS_COMPLETA.csv'
-        df_final.to_csv(archivo_salida, sep=';', index=False, encoding='utf-8-sig')
-        print(f"✅ ¡Éxito! Se ha creado '{archivo_salida}' con un total de {len(df_final)} reviews únicas.")
-    else:
+    total = conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+    print(f"\n⚙️ {cargados} CSV nuevos cargados en '{ARCHIVO_BASE}'.")
+    if total == 0:
         print("⚠️ No se encontraron datos CSV válidos dentro de los zips.")
+        conn.close()
+        return
+
+    exportar_csv(conn)
+    conn.close()
+    print(f"✅ ¡Éxito! Se ha creado '{ARCHIVO_SALIDA}' con un total de {total} reviews únicas.")
 
 if __name__ == "__main__":
-    consolidar_zips()
\ No newline at end of file
+    consolidar_zips()
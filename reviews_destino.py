@@ -1,13 +1,20 @@
 import asyncio
 import pandas as pd
-import json
 import os
 import csv
+import argparse
+import hashlib
 import sys
-import unicodedata
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 from urllib.parse import urljoin
 from playwright.async_api import async_playwright
+from normalizacion import normalizar_texto
+from catalogo_destinos import buscar_destino
+from fechas_reviews import parsear_fecha_civitatis, pais_desde_ubicacion
+from extraccion_reviews import (parsear_reviews_html, leer_reviews_pagina, esperar_reviews_nuevas,
+                                descubrir_paginacion, pedir_pagina, firma_pagina)
+from marcas_reviews import MarcasReviews, nombre_destino, NUEVA, FIN
+from huellas_reviews import HuellasReviews
 
 # --- CONFIGURACIÓN OPTIMIZADA ---
 CONCURRENCIA_MAXIMA = 3      # Pestañas simultáneas
@@ -15,60 +22,11 @@ TIMEOUT_ACTIVIDAD = 600      # 10 Minutos máx por actividad
 MAX_PAGINAS_REVIEWS = 5000   # Prácticamente sin límite
 DIAS_HISTORIA = 1825         # 5 años (365 * 5)
 MAX_REINTENTOS = 3           # Intentos si una página falla
+PAGINAS_EN_PARALELO = 4      # Páginas de opiniones pedidas a la vez por HTTP
 
-# --- DICCIONARIO MESES ---
-MESES_ES = {
-    "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
-    "jul": 7, "ago": 8, "sep": 9, "oct": 10, "nov": 11, "dic": 12
-}
-
-def normalizar_texto(texto):
-    """Limpia acentos, mayúsculas y espacios para una comparación perfecta."""
-    if not texto: return ""
-    texto_limpio = unicodedata.normalize('NFKD', str(texto)).encode('ASCII', 'ignore').decode('utf-8')
-    return texto_limpio.lower().strip()
-
-def parsear_fecha_civitatis(texto_fecha):
-    try:
-        texto = texto_fecha.strip()
-        partes = texto.split('/')
-        if len(partes) != 3: return None
-        dia = int(partes[0].strip())
-        mes_txt = partes[1].strip().lower()[:3] 
-        anio = int(partes[2].strip())
-        numero_mes = MESES_ES.get(mes_txt, 1) 
-        return datetime(anio, numero_mes, dia)
-    except:
-        return None
-
-def cargar_destino_civitatis(input_destino):
-    """Busca el destino exacto cruzando la ciudad y el país."""
-    try:
-        input_limpio = input_destino.split(':')[0].strip()
-        partes = [p.strip() for p in input_limpio.split(',')]
-        
-        nombre_ciudad = normalizar_texto(partes[0])
-        nombre_pais = normalizar_texto(partes[1]) if len(partes) > 1 else ""
-
-        with open('destinos_civitatis.json', 'r', encoding='utf-8') as f:
-            todos = json.load(f)
-            
-        for d in todos:
-            d_name = normalizar_texto(d.get('name', ''))
-            d_country = normalizar_texto(d.get('nameCountry', ''))
-            if nombre_ciudad == d_name and (not nombre_pais or nombre_pais == d_country):
-                return d
-                
-        for d in todos:
-            d_name = normalizar_texto(d.get('name', ''))
-            d_country = normalizar_texto(d.get('nameCountry', ''))
-            if nombre_ciudad in d_name and (not nombre_pais or nombre_pais in d_country):
-                return d
-                
-        return None
-    except Exception as e:
-        print(f"❌ Error leyendo JSON: {e}", flush=True)
-        return None
+def en_parte(url, parte, partes):
+    """Reparte las actividades en `partes` grupos estables por hash de la URL (parte va de 1 a partes)."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big") % partes == parte - 1
 
 class CivitatisTurboScraper:
     SELECTORS = {
@@ -84,9 +42,12 @@ class CivitatisTurboScraper:
     }
 
 
-    def __init__(self, destino_input):
+    def __init__(self, destino_input, refresco_completo=False, parte=1, partes=1):
             self.destino_input = destino_input
-            self.destino_limpio = normalizar_texto(destino_input.split(':')[0]).replace(", ", "_").replace(" ", "_")
+            self.refresco_completo = refresco_completo
+            # Destinos grandes repartidos en varios jobs: cada uno baja solo su parte de las actividades
+            self.parte, self.partes = parte, partes
+            self.destino_limpio = nombre_destino(destino_input, parte, partes)
             
             # --- NUEVO: CREAR CARPETA AISLADA ---
             os.makedirs("resultados", exist_ok=True)
@@ -94,8 +55,13 @@ class CivitatisTurboScraper:
             # Guardamos dentro de la carpeta resultados/
             self.output_file = f"resultados/reviews_{self.destino_limpio}.csv"
             self.progress_file = f"resultados/progreso_{self.destino_limpio}.txt"
+            # Marca de agua por actividad: la próxima pasada solo baja opiniones nuevas.
+            # Una por destino, compartida por sus partes (no depende de cómo se reparta)
+            self.marcas = MarcasReviews(f"resultados/marcas_{nombre_destino(destino_input)}.json")
+            # Huellas de las opiniones ya escritas: evita filas repetidas (reintentos, actividades repetidas)
+            self.huellas = HuellasReviews(f"resultados/huellas_{self.destino_limpio}.txt")
             
-            self.fecha_corte = datetime.now() - timedelta(days=DIAS_HISTORIA)
+            self.fecha_corte = date.today() - timedelta(days=DIAS_HISTORIA)
             self.semaphore = asyncio.Semaphore(CONCURRENCIA_MAXIMA)
             self.actividades_completadas = self._cargar_progreso()
 
@@ -111,6 +77,7 @@ class CivitatisTurboScraper:
         self.actividades_completadas.add(url)
 
     async def run(self):
+        """Devuelve True si quedaron completadas todas las actividades del destino (o de su parte)."""
         if not os.path.exists(self.output_file):
             encabezados = ["pais", "destino", "actividad", "url_actividad", "fecha", "pais_usuario"]
             pd.DataFrame(columns=encabezados).to_csv(
@@ -118,11 +85,11 @@ class CivitatisTurboScraper:
             )
 
         print(f"🚀 Iniciando scraper para el destino: {self.destino_input}", flush=True)
-        destino_obj = cargar_destino_civitatis(self.destino_input)
+        destino_obj = buscar_destino(self.destino_input)
         
         if not destino_obj:
             print(f"⚠️ No se encontró el destino '{self.destino_input}' en el JSON.", flush=True)
-            return
+            return False
 
         nombre_pais = destino_obj.get('nameCountry', 'Desconocido')
         print(f"✅ Destino encontrado: {destino_obj['name']} ({nombre_pais}).", flush=True)
@@ -138,8 +105,9 @@ class CivitatisTurboScraper:
             )
 
             await context.route("**/*", self._block_heavy_resources)
-            await self._procesar_destino_completo(context, nombre_pais, destino_obj)
+            completo = await self._procesar_destino_completo(context, nombre_pais, destino_obj)
             await browser.close()
+        return completo
 
     async def _block_heavy_resources(self, route):
         if route.request.resource_type in ["image", "media", "font", "stylesheet", "other"]:
@@ -164,13 +132,21 @@ class CivitatisTurboScraper:
         finally:
             await page.close()
 
-        if not actividades: return
+        if not actividades: return False
+
+        if self.partes > 1:
+            actividades = [act for act in actividades if en_parte(act['url'], self.parte, self.partes)]
+            print(f"   ↳ Parte {self.parte}/{self.partes}: {len(actividades)} actividades de este job.", flush=True)
 
         actividades_pendientes = [act for act in actividades if act['url'] not in self.actividades_completadas]
         
         print(f"   ↳ {len(actividades)} actividades en total detectadas.")
         print(f"   ↳ {len(actividades) - len(actividades_pendientes)} ya completadas previamente.")
         print(f"   ↳ {len(actividades_pendientes)} pendientes por procesar...", flush=True)
+        if self.refresco_completo:
+            print(f"   ↳ Refresco completo: se ignoran las marcas y se bajan {DIAS_HISTORIA} días de opiniones.", flush=True)
+        else:
+            print(f"   ↳ {len(self.marcas)} actividades con marca: solo se bajan sus opiniones nuevas.", flush=True)
 
         tareas = []
         for act in actividades_pendientes:
@@ -182,6 +158,14 @@ class CivitatisTurboScraper:
         
         await asyncio.gather(*tareas)
 
+        # Pasada terminada: se borra el progreso para que la próxima corrida
+        # revise todas las actividades (las marcas hacen que solo baje lo nuevo)
+        completo = all(act['url'] in self.actividades_completadas for act in actividades)
+        if completo and os.path.exists(self.progress_file):
+            os.remove(self.progress_file)
+            print(f"🏁 Todas las actividades completadas. Progreso reiniciado para el próximo refresco.", flush=True)
+        return completo
+
     async def _get_activities_list(self, page, url_destino_base, slug_destino):
         actividades = []
         try:
@@ -246,8 +230,13 @@ class CivitatisTurboScraper:
         async with self.semaphore:
             for intento in range(1, MAX_REINTENTOS + 1):
                 try:
-                    completado = await asyncio.wait_for(self._extract_reviews_logic(context, base_data), timeout=TIMEOUT_ACTIVIDAD)
+                    seguimiento = self.marcas.seguimiento(base_data['url_actividad'], completo=self.refresco_completo)
+                    self.huellas.iniciar_actividad(base_data['url_actividad'])
+                    completado = await asyncio.wait_for(
+                        self._extract_reviews_logic(context, base_data, seguimiento), timeout=TIMEOUT_ACTIVIDAD
+                    )
                     if completado:
+                        self.marcas.actualizar(base_data['url_actividad'], seguimiento)
                         self._guardar_progreso(base_data['url_actividad']) 
                         break
                 except asyncio.TimeoutError:
@@ -258,8 +247,9 @@ class CivitatisTurboScraper:
                 
                 if intento < MAX_REINTENTOS:
                     await asyncio.sleep(3) 
+            self.huellas.terminar_actividad(base_data['url_actividad'])
 
-    async def _extract_reviews_logic(self, context, base_data):
+    async def _extract_reviews_logic(self, context, base_data, seguimiento):
         page = await context.new_page()
         try:
             url = base_data['url_actividad']
@@ -290,75 +280,169 @@ class CivitatisTurboScraper:
             except Exception:
                 pass 
 
-            paginas = 0
-            alcanzo_limite_fecha = False
+            # Página 1: ya está en el navegador, se parsea el HTML de una vez
+            reviews = parsear_reviews_html(await page.content())
+            if not reviews:
+                # El HTML no tiene el formato esperado: seguimos con el navegador
+                return await self._paginas_con_click(page, base_data, seguimiento)
 
-            while paginas < MAX_PAGINAS_REVIEWS and not alcanzo_limite_fecha:
-                batch = []
-                
-                # Búsqueda protegida de contenedores
-                try:
-                    elements = await page.query_selector_all(self.SELECTORS["review_container"])
-                except Exception:
-                    break # Si el contexto muere leyendo, salimos limpiamente con lo que ya tenemos
-                    
-                if not elements: break
+            batch, huellas, alcanzo_limite_fecha = self._filas_de_pagina(reviews, base_data, seguimiento)
+            self._save_incremental(batch, huellas)
+            if alcanzo_limite_fecha:
+                return True
 
-                for el in elements:
-                    try:
-                        date_el = await el.query_selector(self.SELECTORS["date_text"])
-                        date_text = await date_el.inner_text() if date_el else ""
-                        fecha_dt = parsear_fecha_civitatis(date_text)
-                        
-                        if fecha_dt:
-                            if fecha_dt < self.fecha_corte:
-                                alcanzo_limite_fecha = True
-                                continue 
-                            fecha_csv = fecha_dt.strftime("%Y-%m-%d")
-                        else:
-                            fecha_csv = date_text
-
-                        loc_el = await el.query_selector(self.SELECTORS["location"])
-                        if loc_el:
-                            raw_loc = await loc_el.inner_text()
-                            pais_usuario = raw_loc.replace("-", ",").replace("\n", " ").split(",")[-1].strip()
-                        else: pais_usuario = "N/A"
-
-                        batch.append({**base_data, "fecha": fecha_csv, "pais_usuario": pais_usuario})
-                    except: continue
+            # Resto de páginas: URL directa (href o XHR del botón) pedida por HTTP
+            paginacion, hizo_click = await descubrir_paginacion(page, self.SELECTORS["next_btn_reviews"])
+            if paginacion is None and not hizo_click:
+                return True  # Una sola página de opiniones
 
-                self._save_incremental(batch)
-                
-                if alcanzo_limite_fecha: break
+            firma = firma_pagina(reviews)
+            if paginacion and await self._paginas_directas(context, paginacion, base_data, seguimiento, firma):
+                return True
+
+            print(f"     ↪️ Sin URL directa de opiniones para {base_data['actividad']}, sigo con clicks.", flush=True)
+            # Si descubrir_paginacion ya hizo click, el navegador está pasando a la página 2
+            return await self._paginas_con_click(page, base_data, seguimiento, firma, hacer_click=not hizo_click)
+        finally:
+            await page.close()
 
+    def _filas_de_pagina(self, reviews, base_data, seguimiento):
+        """
+        Convierte las opiniones nuevas de una página en filas (con sus huellas); indica si
+        se llegó a la fecha de corte o a opiniones ya descargadas en una pasada anterior (marca).
+        """
+        batch, huellas = [], []
+        alcanzo_limite_fecha = False
+        for review in reviews:
+            date_text = review['date_text']
+            fecha_dt = parsear_fecha_civitatis(date_text)
+
+            if fecha_dt:
+                if fecha_dt < self.fecha_corte:
+                    alcanzo_limite_fecha = True
+                    continue
+                fecha_csv = fecha_dt.isoformat()
+            else:
+                fecha_csv = date_text
+
+            raw_loc = review['location_text']
+            huella = self.huellas.huella(base_data['url_actividad'], fecha_csv, raw_loc)
+            estado = seguimiento.clasificar(fecha_csv if fecha_dt else None, raw_loc)
+            if estado == FIN:
+                alcanzo_limite_fecha = True
+                continue
+            if estado != NUEVA or not self.huellas.es_nueva(huella):
+                continue
+
+            pais_usuario = pais_desde_ubicacion(raw_loc) if raw_loc is not None else "N/A"
+
+            batch.append({**base_data, "fecha": fecha_dt or fecha_csv, "pais_usuario": pais_usuario})
+            huellas.append(huella)
+        return batch, huellas, alcanzo_limite_fecha
+
+    async def _paginas_directas(self, context, paginacion, base_data, seguimiento, firma_primera):
+        """
+        Pide las páginas 2, 3, ... por HTTP, de a PAGINAS_EN_PARALELO, hasta la fecha de corte.
+        Devuelve False si la URL directa no sirve (la página 2 no trae opiniones o repite la 1).
+        Corta si una página repite otra ya vista (el servidor ignora el número de página).
+        """
+        firmas = {firma_primera}
+        pagina = 2
+        while pagina <= MAX_PAGINAS_REVIEWS:
+            lote = list(range(pagina, min(pagina + PAGINAS_EN_PARALELO, MAX_PAGINAS_REVIEWS + 1)))
+            resultados = await asyncio.gather(*(pedir_pagina(context.request, paginacion, n) for n in lote))
+
+            for n, reviews in zip(lote, resultados):
+                if n == 2 and (not reviews or firma_pagina(reviews) in firmas):
+                    return False
+                if reviews is None:
+                    raise RuntimeError(f"No se pudo descargar la página {n} de opiniones")
+                if not reviews:
+                    return True
+                firma = firma_pagina(reviews)
+                if firma in firmas:
+                    return True  # Página repetida: no hay más opiniones distintas
+                firmas.add(firma)
+
+                batch, huellas, alcanzo_limite_fecha = self._filas_de_pagina(reviews, base_data, seguimiento)
+                self._save_incremental(batch, huellas)
+                if alcanzo_limite_fecha:
+                    return True
+
+            pagina += len(lote)
+        return True
+
+    async def _paginas_con_click(self, page, base_data, seguimiento, firma_anterior=None, hacer_click=False):
+        """
+        Respaldo: recorre las opiniones con el navegador, haciendo click en "siguiente".
+        firma_anterior: página ya guardada; antes de leer se espera a que la lista cambie.
+        hacer_click: el navegador sigue en esa página y hay que pasar a la siguiente.
+        Devuelve False si falla un click o una lectura, para no marcar la actividad como completa.
+        """
+        selectores = (self.SELECTORS["review_container"], self.SELECTORS["date_text"], self.SELECTORS["location"])
+        firmas = {firma_anterior} if firma_anterior else set()
+        paginas = 0
+
+        while paginas < MAX_PAGINAS_REVIEWS:
+            if hacer_click:
                 # Click de siguiente página protegido
                 try:
                     next_btn = await page.query_selector(self.SELECTORS["next_btn_reviews"])
                     if next_btn and await next_btn.is_visible():
                         await page.evaluate("(el) => el.click()", next_btn)
-                        await page.wait_for_timeout(1500) # Dejar que carguen las nuevas opiniones
                         paginas += 1
                     else: break
                 except Exception:
-                    break 
-            
-            return True 
-        finally:
-            await page.close()
+                    return False # No se pudo pasar de página: la actividad queda pendiente
+            hacer_click = True
 
-    def _save_incremental(self, data):
+            # Todas las opiniones de la página en una sola llamada al navegador
+            try:
+                if firma_anterior is None:
+                    reviews = await leer_reviews_pagina(page, *selectores)
+                else:
+                    # El click no espera a que se pinte la página nueva: se lee cuando la lista cambia
+                    reviews = await esperar_reviews_nuevas(page, firma_anterior, *selectores)
+            except Exception:
+                return False # El contexto murió leyendo: lo guardado queda, pero sin marcar la actividad
+
+            if not reviews:
+                # Sin click previo es una actividad sin opiniones; tras un click, la página no llegó a cambiar
+                return firma_anterior is None
+            firma_anterior = firma_pagina(reviews)
+            if firma_anterior in firmas: break # Volvió a una página ya guardada
+            firmas.add(firma_anterior)
+
+            batch, huellas, alcanzo_limite_fecha = self._filas_de_pagina(reviews, base_data, seguimiento)
+            self._save_incremental(batch, huellas)
+            if alcanzo_limite_fecha: break
+
+        return True
+
+    def _save_incremental(self, data, huellas):
         if not data: return
         try:
             df = pd.DataFrame(data)
             df.to_csv(self.output_file, mode='a', index=False, header=False, 
                       encoding='utf-8-sig', sep=';', quoting=csv.QUOTE_MINIMAL)
+            self.huellas.confirmar(huellas)
         except: pass
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        DESTINO = sys.argv[1]
-    else:
-        DESTINO = "Punta Cana, República Dominicana"
-
-    scraper = CivitatisTurboScraper(DESTINO)
-    asyncio.run(scraper.run())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Opiniones de Civitatis de todas las actividades de un destino.")
+    parser.add_argument("destino", nargs="?", default="Punta Cana, República Dominicana", help='"Ciudad, País"')
+    parser.add_argument("--refresco-completo", action="store_true",
+                        help="Ignora las marcas de agua y vuelve a bajar todas las opiniones del período")
+    parser.add_argument("--parte", default="1/1", help='Solo la parte j de k de las actividades, como "2/3"')
+    args = parser.parse_args()
+    try:
+        parte, partes = (int(x) for x in args.parte.split('/'))
+    except ValueError:
+        parte, partes = 0, 0
+    if not 1 <= parte <= partes:
+        parser.error(f"--parte debe ser j/k con 1 <= j <= k (recibido: {args.parte})")
+
+    scraper = CivitatisTurboScraper(args.destino, refresco_completo=args.refresco_completo, parte=parte, partes=partes)
+    completo = asyncio.run(scraper.run())
+    # Código 1 si quedaron actividades sin terminar: la etapa de verificación lo marca
+    sys.exit(0 if completo else 1)
\ No newline at end of file
@@ -1,12 +1,40 @@
 import csv
+import json
+import os
 import re
+import sys
+import threading
 import time
 import random
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
 import requests
 
 INPUT_CSV = 'viator/viator.csv'
 OUTPUT_CSV = 'viator/viator_con_proveedores.csv'
 
+# Supplier details already fetched (survives between runs)
+CACHE_JSON = 'viator/supplier_cache.json'
+
+# Append-only log of finished rows; a restart skips everything recorded as done
+CHECKPOINT_JSONL = 'viator/viator_con_proveedores.checkpoint.jsonl'
+
+# Checkpoint statuses that are final; 'empty' and 'failed' rows are retried
+DONE_STATUSES = ('ok', 'skipped')
+
+# Optional cookie override, read again after a 403 without restarting:
+# {"datadome": "...", "xsrf_token": "...", "orion_session": "...", "viator_persistent": "..."}
+COOKIES_JSON = 'viator/cookies.json'
+
+# Parallel requests to the supplier-details endpoint
+MAX_WORKERS = 4
+
+SUPPLIER_COLUMNS = ['Trading Name', 'Legal Name', 'Address', 'Phone', 'Email', 'Website']
+
+# Last output column: checkpoint status of the row, or 'pending' if this run never reached it
+STATUS_COLUMN = 'Status'
+PENDING_STATUS = 'pending'
+
 # =============================================================================
 # SESSION COOKIES — refresh these when the script starts getting 403s
 # Get fresh values: Chrome on viator.com → F12 → Network → any supplier-details
@@ -102,7 +130,25 @@ def parse_address(addr):
     return str(addr)
 
 
-def build_session():
+class SessionExpired(Exception):
+    """Viator answered 403: the DataDome/session cookies are no longer valid."""
+
+
+def load_cookies():
+    """Cookie values from COOKIES_JSON if present, otherwise the constants above."""
+    cookies = {
+        'datadome': DATADOME,
+        'xsrf_token': XSRF_TOKEN,
+        'orion_session': ORION_SESSION,
+        'viator_persistent': VIATOR_PERSISTENT,
+    }
+    if os.path.exists(COOKIES_JSON):
+        with open(COOKIES_JSON, 'r', encoding='utf-8') as f:
+            cookies.update({k: v for k, v in json.load(f).items() if k in cookies and v})
+    return cookies
+
+
+def build_session(cookies):
     session = requests.Session()
     session.headers.update({
         'User-Agent': (
@@ -114,8 +160,8 @@ def build_session():
         'Accept-Language': 'es-ES,es;q=0.9',
         'Accept-Encoding': 'gzip, deflate, br, zstd',
         'X-Requested-With': 'XMLHttpRequest',
-        'X-Datadome-Clientid': DATADOME,
-        'X-XSRF-TOKEN': XSRF_TOKEN,
+        'X-Datadome-Clientid': cookies['datadome'],
+        'X-XSRF-TOKEN': cookies['xsrf_token'],
         'Sec-Fetch-Dest': 'empty',
         'Sec-Fetch-Mode': 'cors',
         'Sec-Fetch-Site': 'same-origin',
@@ -125,10 +171,10 @@ def build_session():
     })
     # Set all cookies that were present in the real browser request
     for name, value in [
-        ('datadome', DATADOME),
-        ('XSRF-TOKEN', XSRF_TOKEN),
-        ('ORION_SESSION', ORION_SESSION),
-        ('x-viator-tapersistentcookie', VIATOR_PERSISTENT),
+        ('datadome', cookies['datadome']),
+        ('XSRF-TOKEN', cookies['xsrf_token']),
+        ('ORION_SESSION', cookies['orion_session']),
+        ('x-viator-tapersistentcookie', cookies['viator_persistent']),
     ]:
         session.cookies.set(name, value, domain='.viator.com')
 
@@ -146,66 +192,329 @@ def fetch_supplier(session, code, prefix, referer_url):
     if resp.status_code == 200:
         return resp.json()
     if resp.status_code == 403:
-        print('  403 — session cookies have expired. Refresh them in the script.')
-    else:
-        print(f'  HTTP {resp.status_code}')
+        raise SessionExpired(code)
+    print(f'  HTTP {resp.status_code} for {code}')
     return None
 
 
+def supplier_columns(data):
+    """The six output columns for a supplier-details payload (blank if missing)."""
+    if not data:
+        return [''] * len(SUPPLIER_COLUMNS)
+    return [
+        data.get('tradingName', ''),
+        data.get('legalName', ''),
+        parse_address(data.get('address', {})),
+        data.get('contactNumber', ''),
+        data.get('contactEmail', ''),
+        data.get('websiteUrl', ''),
+    ]
+
+
+class SupplierCache:
+    """Persistent supplier details: prefix -> payload, product code -> prefix.
+
+    The numeric prefix of a product code is the supplier ID, so once one
+    product of a supplier has been fetched every other product reuses it.
+    """
+
+    SAVE_EVERY = 25
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.suppliers = {}
+        self.products = {}
+        self._unsaved = 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            self.suppliers = stored.get('suppliers', {})
+            self.products = stored.get('products', {})
+
+    def get(self, code, prefix):
+        with self.lock:
+            return self.suppliers.get(self.products.get(code, prefix))
+
+    def put(self, code, prefix, data):
+        with self.lock:
+            self.suppliers[prefix] = data
+            self.products[code] = prefix
+            self._unsaved += 1
+            if self._unsaved >= self.SAVE_EVERY:
+                self._save_locked()
+
+    def link(self, code, prefix):
+        with self.lock:
+            if prefix in self.suppliers and self.products.get(code) != prefix:
+                self.products[code] = prefix
+                self._unsaved += 1
+
+    def save(self):
+        with self.lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'suppliers': self.suppliers, 'products': self.products}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+
+class SupplierFetcher:
+    """Bounded thread pool over fetch_supplier with per-supplier dedupe.
+
+    Each supplier prefix is requested at most once per run (concurrent rows
+    share the same Future) and never again once it is in the cache. A 403
+    pauses every worker; the main thread (see result) asks for fresh cookies
+    in COOKIES_JSON, or stops the run when there is no terminal to ask.
+    """
+
+    def __init__(self, cache, max_workers=MAX_WORKERS):
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight = {}
+        self.retries = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.running = threading.Event()
+        self.running.set()
+        self.expired = threading.Event()
+        self.aborted = False
+        self.cookies = load_cookies()
+        self.generation = 0
+
+    def submit(self, code, prefix, referer_url):
+        cached = self.cache.get(code, prefix)
+        if cached is not None:
+            self.cache.link(code, prefix)
+            future = Future()
+            future.set_result(cached)
+            return future
+        with self.lock:
+            future = self.in_flight.get(prefix)
+            if future is None:
+                future = self.executor.submit(self._fetch, code, prefix, referer_url)
+                self.in_flight[prefix] = future
+        return future
+
+    def result(self, future, code, prefix, referer_url):
+        """Wait for a submitted row from the main thread, handling expired cookies here.
+
+        The future is shared by every product of the supplier, so a failed or
+        empty fetch is retried once (with this row's product) before the other
+        products take that result; the retry is shared in the same way.
+        """
+        try:
+            data = self._wait(future)
+        except SessionExpired:
+            raise
+        except Exception:
+            data = None
+        if data is not None:
+            return data
+        with self.lock:
+            retry = self.retries.get(prefix)
+            if retry is None:
+                retry = self.executor.submit(self._fetch, code, prefix, referer_url)
+                self.retries[prefix] = retry
+        return self._wait(retry)
+
+    def _wait(self, future):
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except FutureTimeout:
+                if self.expired.is_set():
+                    self._refresh_cookies()
+
+    def shutdown(self):
+        # Release workers still paused on a 403 so the pool can finish
+        self.aborted = True
+        self.running.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _session(self):
+        if getattr(self.local, 'generation', None) != self.generation:
+            self.local.session = build_session(self.cookies)
+            self.local.generation = self.generation
+        return self.local.session
+
+    def _fetch(self, code, prefix, referer_url):
+        while True:
+            self.running.wait()
+            if self.aborted:
+                raise SessionExpired(code)
+            generation = self.generation
+            try:
+                data = fetch_supplier(self._session(), code, prefix, referer_url)
+            except SessionExpired:
+                self._pause(generation)
+                continue
+            # Small delay per worker — lightweight API, no need for long waits
+            time.sleep(random.uniform(0.3, 0.8))
+            if data:
+                self.cache.put(code, prefix, data)
+            return data
+
+    def _pause(self, generation):
+        with self.lock:
+            # Another worker already refreshed (or is refreshing) the cookies
+            if generation != self.generation or not self.running.is_set():
+                return
+            self.running.clear()
+        self.expired.set()
+
+    def _refresh_cookies(self):
+        print('\n403 — session cookies have expired. All workers paused.')
+        if sys.stdin.isatty():
+            print(f'Save fresh cookie values to {COOKIES_JSON} and press Enter (Ctrl+D to stop).')
+            try:
+                input()
+                self.cookies = load_cookies()
+                self.generation += 1
+            except EOFError:
+                self.aborted = True
+        else:
+            # Unattended run: nobody can paste cookies, stop and let the next run resume
+            self.aborted = True
+        self.expired.clear()
+        self.running.set()
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    print('Starting Viator supplier scraper...')
-    session = build_session()
+class Checkpoint:
+    """Per-row results of previous runs, keyed by input row index.
 
-    with open(INPUT_CSV, 'r', encoding='utf-8') as infile, \
-         open(OUTPUT_CSV, 'w', encoding='utf-8', newline='') as outfile:
+    Each line is {"row", "url", "status", "columns"}; later lines win, so a
+    row retried in a new run simply appends its new result.
+    """
 
-        reader = csv.reader(infile)
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # truncated last line after a hard kill
+                    self.results[entry['row']] = entry
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def is_done(self, row_idx, url):
+        entry = self.results.get(row_idx)
+        return bool(entry) and entry['url'] == url and entry['status'] in DONE_STATUSES
+
+    def record(self, row_idx, url, status, columns):
+        entry = {'row': row_idx, 'url': url, 'status': status, 'columns': columns}
+        self.results[row_idx] = entry
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def entry_for(self, row_idx, url):
+        entry = self.results.get(row_idx)
+        if entry and entry['url'] == url:
+            return entry
+        return None
+
+    def close(self):
+        self._file.close()
+
+
+def write_output(header, rows, checkpoint):
+    """Rebuild OUTPUT_CSV in input order from the checkpoint. Returns rows still pending.
+
+    Every input row is written; rows no run has reached yet get blank supplier
+    columns and STATUS_COLUMN = 'pending', so a partial file never looks complete.
+    """
+    missing = 0
+    with open(OUTPUT_CSV, 'w', encoding='utf-8', newline='') as outfile:
         writer = csv.writer(outfile)
-
-        header = next(reader)
-        writer.writerow(header + ['Trading Name', 'Legal Name', 'Address', 'Phone', 'Email', 'Website'])
-
-        for row_idx, row in enumerate(reader, start=1):
-            url = row[0].strip().strip('"')
-            if not url.startswith('http'):
-                writer.writerow(row + [''] * 6)
+        writer.writerow(header + SUPPLIER_COLUMNS + [STATUS_COLUMN])
+        for row_idx, row in enumerate(rows, start=1):
+            entry = checkpoint.entry_for(row_idx, row[0].strip().strip('"'))
+            if entry is None:
+                missing += 1
+                writer.writerow(row + supplier_columns(None) + [PENDING_STATUS])
                 continue
+            writer.writerow(row + entry['columns'] + [entry['status']])
+    return missing
 
-            code, prefix = extract_product_code(url)
-            if not code or not prefix:
-                print(f'[{row_idx}] Cannot parse product code from: {url}')
-                writer.writerow(row + [''] * 6)
-                continue
 
-            print(f'[{row_idx}] {code}', end=' ... ', flush=True)
+def main():
+    print('Starting Viator supplier scraper...')
+    cache = SupplierCache(CACHE_JSON)
+    fetcher = SupplierFetcher(cache)
+    checkpoint = Checkpoint(CHECKPOINT_JSONL)
 
-            trading_name = legal_name = address = phone = email = website = ''
+    with open(INPUT_CSV, 'r', encoding='utf-8') as infile:
+        reader = csv.reader(infile)
+        header = next(reader)
+        rows = list(reader)
+
+    # Queue every pending row up front; results are logged back in input order
+    jobs = []
+    done = 0
+    for row_idx, row in enumerate(rows, start=1):
+        url = row[0].strip().strip('"')
+        if checkpoint.is_done(row_idx, url):
+            done += 1
+            continue
+
+        if not url.startswith('http'):
+            jobs.append((row_idx, url, None, None, None))
+            continue
+
+        code, prefix = extract_product_code(url)
+        if not code or not prefix:
+            print(f'[{row_idx}] Cannot parse product code from: {url}')
+            jobs.append((row_idx, url, None, None, None))
+            continue
+
+        jobs.append((row_idx, url, code, prefix, fetcher.submit(code, prefix, url)))
+
+    print(f'{len(rows)} rows: {done} already done, {len(jobs)} pending, '
+          f'{len(fetcher.in_flight)} supplier requests queued ({MAX_WORKERS} workers).')
+
+    try:
+        for row_idx, url, code, prefix, future in jobs:
+            if future is None:
+                checkpoint.record(row_idx, url, 'skipped', supplier_columns(None))
+                continue
 
+            status = 'ok'
             try:
-                data = fetch_supplier(session, code, prefix, url)
-                if data:
-                    trading_name = data.get('tradingName', '')
-                    legal_name   = data.get('legalName', '')
-                    phone        = data.get('contactNumber', '')
-                    email        = data.get('contactEmail', '')
-                    website      = data.get('websiteUrl', '')
-                    address      = parse_address(data.get('address', {}))
-                    print(trading_name or '(no name)')
-                else:
-                    print('no data')
+                data = fetcher.result(future, code, prefix, url)
+            except SessionExpired:
+                print(f'\nStopped at row {row_idx}: session cookies expired. Run again to resume.')
+                break
             except Exception as e:
-                print(f'error: {e}')
-
-            writer.writerow(row + [trading_name, legal_name, address, phone, email, website])
-
-            # Small delay — lightweight API, no need for long waits
-            time.sleep(random.uniform(0.3, 0.8))
-
-    print(f'\nDone. Saved to {OUTPUT_CSV}')
+                print(f'[{row_idx}] {code} ... error: {e}')
+                data = None
+                status = 'failed'
+
+            columns = supplier_columns(data)
+            if status == 'ok' and not data:
+                status = 'empty'
+            print(f'[{row_idx}] {code} ... {columns[0] or ("(no name)" if data else "no data")}')
+            checkpoint.record(row_idx, url, status, columns)
+    finally:
+        fetcher.shutdown()
+        cache.save()
+        checkpoint.close()
+
+    missing = write_output(header, rows, checkpoint)
+    retry = sum(1 for e in checkpoint.results.values() if e['status'] not in DONE_STATUSES)
+    print(f'\nSaved to {OUTPUT_CSV} ({missing} rows pending, {retry} empty/failed to retry).')
 
 
 if __name__ == '__main__':